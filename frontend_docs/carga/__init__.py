@@ -0,0 +1,9 @@
+"""
+Harness de carga del backend SmartSales365
+==========================================
+
+Escenarios de carga construidos sobre el mismo API que prueba
+`test_flujo_completo_devoluciones.py`. Se ejecutan desde `frontend_docs/`:
+
+    python -m carga contencion-stock --producto 153 --stock-inicial 5
+"""
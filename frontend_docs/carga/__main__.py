@@ -0,0 +1,46 @@
+"""
+Punto de entrada: python -m carga <escenario> [opciones]
+"""
+
+import argparse
+import sys
+
+from . import (calentamiento, contencion_stock, distribuido, flujo_devoluciones,
+               modelo_devoluciones, muestras, typeahead)
+
+
+def _scenario(module):
+    return module.add_arguments, module.run, module.__doc__.strip().splitlines()[0]
+
+
+# Subcomando -> (add_arguments, run, ayuda)
+SCENARIOS = {
+    "contencion-stock": _scenario(contencion_stock),
+    "typeahead": _scenario(typeahead),
+    "flujo-devoluciones": _scenario(flujo_devoluciones),
+    "modelo-devoluciones": _scenario(modelo_devoluciones),
+    "coordinador": (distribuido.add_coordinator_arguments, distribuido.run_coordinator,
+                    "Modo distribuido: reparte el flujo de devoluciones entre workers"),
+    "worker": (distribuido.add_worker_arguments, distribuido.run_worker,
+               "Modo distribuido: worker que ejecuta su tramo de usuarios"),
+    "muestras": _scenario(muestras),
+    "arranque-frio": _scenario(calentamiento),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="carga", description="Harness de carga SmartSales365")
+    subparsers = parser.add_subparsers(dest="scenario", required=True)
+    for name, (add_arguments, _, help_text) in SCENARIOS.items():
+        add_arguments(subparsers.add_parser(name, help=help_text))
+
+    args = parser.parse_args(argv)
+    try:
+        return SCENARIOS[args.scenario][1](args)
+    except KeyboardInterrupt:
+        print("\n\nPrueba de carga interrumpida por el usuario")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
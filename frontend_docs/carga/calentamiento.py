@@ -0,0 +1,207 @@
+"""
+Arranque en frío vs. régimen: calentamiento y primeras requests
+===============================================================
+
+Las primeras llamadas de `main()` (los `login_user` y `get_existing_product`)
+pegan contra cachés frías, conexiones nuevas a la BD y workers de gunicorn
+recién levantados. Mezcladas con el resto inflan las estadísticas de
+régimen y, a la vez, esconden la latencia que ve un usuario cuando el
+autoscaling levanta un contenedor nuevo. Por eso se separan:
+
+- Calentamiento (--calentamiento S, --calentamiento-endpoints): tras el
+  login, los clientes recorren esos GETs durante S segundos. Ni esas
+  muestras ni las del login entran en las estadísticas de régimen; en
+  --trazas y --muestras quedan marcadas con su etapa (`stage`).
+- Arranque en frío (--arranque-frio N): las primeras N requests se guardan
+  completas y se reportan una a una con sus fases, más una comparación
+  frío vs. régimen por endpoint.
+
+Estas opciones valen para todos los escenarios. Este subcomando además
+espera a que el backend acepte conexiones (p.ej. tras reiniciarlo o
+escalar), mide las primeras N requests, calienta y mide el régimen con
+los mismos endpoints:
+
+    python -m carga arranque-frio --esperar-backend 120 --arranque-frio 50 --duracion 20
+"""
+
+import socket
+import time
+from urllib.parse import urlsplit
+
+from .cliente import (add_connection_arguments, client_from_args, login_clients, parse_credentials,
+                      print_phase_report)
+from .ejecutor import run_concurrent
+from .metricas import (REPORT_COLUMNS, STAGE_STEADY, STAGE_WARMUP, ColdStartRecorder,
+                       MetricsCollector)
+from .salida import print_error, print_header, print_info, print_success, print_table
+
+COLD_START_COLUMNS = ["#", "t ms", "request", "status", "total ms", "connect", "ttfb",
+                      "server-timing"]
+COMPARISON_COLUMNS = ["endpoint", "frío n", "frío p50", "frío max", "régimen n",
+                      "régimen p50", "régimen p95", "frío/régimen p50"]
+
+
+def parse_endpoints(value):
+    """Convierte "products/,orders/" en ["products/", "orders/"]"""
+    return [e.strip() for e in value.split(",") if e.strip()]
+
+
+def hit_endpoints(client, aliases, endpoints, duration_s=None, until=None):
+    """
+    Un hilo por alias recorriendo `endpoints` con GET hasta `duration_s`
+    segundos o hasta que `until()` sea verdadero. Devuelve las requests enviadas.
+    """
+    deadline = None if duration_s is None else time.perf_counter() + duration_s
+
+    def task(i):
+        # Cada hilo empieza por un endpoint distinto
+        offset = i % len(endpoints)
+        order = endpoints[offset:] + endpoints[:offset]
+        sent = 0
+        while True:
+            for endpoint in order:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return sent
+                if until is not None and until():
+                    return sent
+                client.request("GET", endpoint, aliases[i])
+                sent += 1
+
+    results, _ = run_concurrent(len(aliases), task)
+    return sum(results)
+
+
+def warm_up(client, args, aliases):
+    """
+    Calentamiento opcional tras el login. Siempre deja las métricas, las
+    estadísticas de resiliencia y los breakers en cero y marca las
+    muestras siguientes como régimen.
+    """
+    if args.calentamiento > 0 and aliases:
+        endpoints = parse_endpoints(args.calentamiento_endpoints)
+        print_info(f"Calentamiento: {args.calentamiento} s sobre {', '.join(endpoints)}...")
+        client.stage = STAGE_WARMUP
+        sent = hit_endpoints(client, aliases, endpoints, duration_s=args.calentamiento)
+        print_info(f"Calentamiento terminado: {sent} request(s) fuera de las estadísticas")
+    client.stage = STAGE_STEADY
+    client.metrics.reset()
+    if client.resilience is not None:
+        client.resilience.reset()
+
+
+def cold_start_recorder(client):
+    """El ColdStartRecorder del cliente, si se pidió --arranque-frio"""
+    for sink in client.sample_sinks:
+        if isinstance(sink, ColdStartRecorder):
+            return sink
+    return None
+
+
+def wait_for_backend(base_url, timeout_s):
+    """
+    Espera a que el backend acepte conexiones TCP. Devuelve los segundos
+    esperados, o None si no levantó dentro de `timeout_s`.
+    """
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    start = time.perf_counter()
+    while True:
+        try:
+            socket.create_connection((parts.hostname, port), timeout=1).close()
+            return time.perf_counter() - start
+        except OSError:
+            if time.perf_counter() - start >= timeout_s:
+                return None
+            time.sleep(0.2)
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_cold_start_report(client):
+    """Primeras N requests una a una y comparación frío vs. régimen"""
+    recorder = cold_start_recorder(client)
+    if recorder is not None:
+        print_cold_start_samples(recorder.samples, client.metrics)
+
+
+def print_cold_start_samples(samples, steady):
+    """
+    Reporte de arranque en frío de `samples` (de uno o varios clientes)
+    comparado con el MetricsCollector de régimen `steady`
+    """
+    if not samples:
+        return
+    # Se guardan al terminar: se ordenan por inicio para la línea de tiempo
+    samples = sorted(samples, key=lambda s: s.started_at)
+    t0 = samples[0].started_at
+
+    print_header(f"ARRANQUE EN FRÍO: PRIMERAS {len(samples)} REQUESTS")
+    rows = []
+    for i, sample in enumerate(samples, 1):
+        server = ", ".join(f"{k} {_ms(v)}" for k, v in sorted(sample.server_timing.items()))
+        rows.append([i, round((sample.started_at - t0) * 1000),
+                     f"{sample.method} {sample.endpoint}", sample.status,
+                     _ms(sample.latency_ms), _ms(sample.phases.get("connect")),
+                     _ms(sample.phases.get("ttfb")), server or "-"])
+    print_table(COLD_START_COLUMNS, rows)
+
+    print_header("FRÍO VS. RÉGIMEN (ms)")
+    cold = MetricsCollector()
+    for sample in samples:
+        cold.record(sample)
+    rows = []
+    for endpoint in sorted(cold.endpoints):
+        cold_hist = cold.histogram(endpoint)
+        warm_hist = steady.histogram(endpoint)
+        cold_p50 = cold_hist.percentile(50)
+        warm_p50 = warm_hist.percentile(50)
+        ratio = f"{cold_p50 / warm_p50:.1f}x" if cold_p50 and warm_p50 else "-"
+        rows.append([endpoint, cold_hist.count, _ms(cold_p50), _ms(cold_hist.max),
+                     warm_hist.count, _ms(warm_p50), _ms(warm_hist.percentile(95)), ratio])
+    print_table(COMPARISON_COLUMNS, rows)
+
+
+def add_arguments(parser):
+    add_connection_arguments(parser)
+    parser.add_argument("--esperar-backend", type=float, default=60,
+                        help="Segundos máximos esperando a que el backend acepte conexiones")
+    parser.add_argument("--duracion", type=float, default=20,
+                        help="Segundos de medición en régimen tras el calentamiento")
+    parser.set_defaults(arranque_frio=50, calentamiento=10)
+
+
+def run(args):
+    print_header("ESCENARIO: ARRANQUE EN FRÍO VS. RÉGIMEN")
+    print_info(f"Esperando a que {args.base_url} acepte conexiones...")
+    waited = wait_for_backend(args.base_url, args.esperar_backend)
+    if waited is None:
+        print_error(f"El backend no levantó en {args.esperar_backend} s")
+        return 1
+    print_success(f"Backend disponible tras {waited:.1f} s")
+
+    with client_from_args(args) as client:
+        recorder = cold_start_recorder(client)
+        if recorder is None:
+            print_error("--arranque-frio debe ser mayor que 0")
+            return 1
+
+        # Las primeras requests son las mismas que en main(): login y catálogo
+        aliases = login_clients(client, parse_credentials(args.clientes))
+        if not aliases:
+            print_error("No se pudo autenticar a ningún cliente")
+            return 1
+        endpoints = parse_endpoints(args.calentamiento_endpoints)
+        hit_endpoints(client, aliases, endpoints, until=lambda: recorder.full)
+        print_info(f"{len(recorder.samples)} request(s) en frío registradas")
+
+        warm_up(client, args, aliases)
+        print_info(f"Midiendo régimen: {args.duracion} s...")
+        hit_endpoints(client, aliases, endpoints, duration_s=args.duracion)
+
+        print_header("RÉGIMEN - RESULTADOS")
+        print_table(REPORT_COLUMNS, client.metrics.report_rows())
+        print_phase_report(client.metrics)
+        print_cold_start_report(client)
+        return 0
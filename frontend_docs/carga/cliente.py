@@ -0,0 +1,533 @@
+"""
+Cliente HTTP del harness de carga
+=================================
+
+Cliente sobre `http.client` (stdlib) para poder medir cada fase de la
+llamada, cosa que `requests` no expone:
+
+- acquire:  espera por una conexión libre del pool (starvation del cliente)
+- connect:  TCP/TLS de una conexión nueva (0 si se reutiliza keep-alive)
+- send:     escritura de la request
+- ttfb:     hasta recibir status + headers (aquí vive el tiempo de Django)
+- download: lectura del body
+- decode:   json.loads del body
+
+Además:
+- Tokens JWT por alias (mismo `token/` que usa `login_user` en
+  `test_flujo_completo_devoluciones.py`).
+- Cada request lleva un `X-Request-ID` propio; se guarda el que devuelva
+  el servidor (si lo hay) y el header `Server-Timing`, para cruzar las
+  muestras del cliente con las trazas del backend.
+- Una muestra (Sample) por llamada, agrupada por plantilla de endpoint
+  (p.ej. "products/{id}/") en el MetricsCollector.
+- Cada muestra lleva la etapa en que se tomó (arranque, calentamiento o
+  régimen), para separarlas en las trazas y exportaciones.
+"""
+
+import http.client
+import os
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from json import dumps as json_dumps, loads as json_loads
+from urllib.parse import urlencode, urlsplit
+
+from .metricas import STAGE_SETUP, ColdStartRecorder, MetricsCollector, phase_columns
+from .muestras import DEFAULT_CHUNK_ROWS, SampleRecorder
+from .resiliencia import IDEMPOTENCY_HEADER, SAFE_METHODS, Resilience, RetryPolicy
+from .salida import print_header, print_table
+
+# Configuración
+BASE_URL = os.environ.get("CARGA_BASE_URL", "http://localhost:8000/api")
+DEFAULT_TIMEOUT = 10
+
+# Usuarios semilla del backend (los mismos del script de flujo completo)
+DEFAULT_USERS = {
+    "cliente": ("juan_cliente", "juan123"),
+    "manager": ("carlos_manager", "carlos123"),
+    "admin": ("admin", "admin123"),
+}
+
+# GETs que se recorren durante el calentamiento (los de main() del script)
+WARMUP_ENDPOINTS = "products/,orders/,users/wallets/my_wallet/"
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Headers de ID de request que suelen devolver los middlewares de Django
+RESPONSE_ID_HEADERS = ("X-Request-ID", "Request-ID", "X-Correlation-ID", "X-Amzn-Trace-Id")
+
+PHASES = ("acquire", "connect", "send", "ttfb", "download", "decode")
+
+# Errores tras los que una conexión keep-alive reutilizada se da por
+# cerrada por el servidor. Se reenvía una vez con conexión nueva sólo si
+# la request es idempotente: el servidor pudo haberla procesado igual
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError,
+                           BrokenPipeError)
+
+
+class StaleConnection(http.client.HTTPException):
+    """El servidor cerró una conexión keep-alive reutilizada"""
+
+
+@dataclass
+class Sample:
+    """Una llamada HTTP medida por el harness"""
+    started_at: float
+    endpoint: str
+    method: str
+    role: str
+    status: int
+    latency_ms: float
+    bytes: int = 0
+    error: str = None
+    # Fases (ms); ver docstring del módulo
+    phases: dict = field(default_factory=dict)
+    reused: bool = False
+    request_id: str = None
+    server_request_id: str = None
+    # Server-Timing parseado: {"db": 12.3, "app": 40.1}
+    server_timing: dict = field(default_factory=dict)
+    # Etapa de la corrida: STAGE_SETUP, STAGE_WARMUP o STAGE_STEADY
+    stage: str = STAGE_SETUP
+
+
+@dataclass
+class Result:
+    """Respuesta ya decodificada + su muestra"""
+    status: int
+    data: object = None
+    text: str = ""
+    # HTTPMessage de la respuesta: `.get` no distingue mayúsculas
+    headers: Mapping = field(default_factory=dict)
+    sample: Sample = None
+    attempts: int = 1
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+
+def parse_credentials(value):
+    """Convierte "user:pass,user2:pass2" en [(user, pass), ...]"""
+    credentials = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        username, _, password = item.partition(":")
+        credentials.append((username, password))
+    return credentials
+
+
+def parse_server_timing(value):
+    """
+    Parsea un header Server-Timing:
+    'db;dur=12.3, cache;desc="hit", app;dur=40' -> {"db": 12.3, "app": 40.0}
+    Las métricas sin `dur` se ignoran.
+    """
+    timings = {}
+    if not value:
+        return timings
+    for metric in value.split(","):
+        parts = [p.strip() for p in metric.split(";")]
+        name = parts[0]
+        for param in parts[1:]:
+            key, _, raw = param.partition("=")
+            if key.strip().lower() == "dur":
+                try:
+                    timings[name] = float(raw.strip().strip('"'))
+                except ValueError:
+                    pass
+    return timings
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones keep-alive hacia un host.
+
+    Con `max_size=None` se abre una conexión por hilo que la necesite (sin
+    espera); con un límite, los hilos esperan en `acquire` igual que en un
+    pool de conexiones real, y esa espera queda medida como fase propia.
+    """
+
+    def __init__(self, base_url, max_size=None, timeout=DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+
+    def _new_connection(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self):
+        """Devuelve (conexión, reutilizada). Bloquea si el pool está lleno"""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop(), True
+                if self.max_size is None or self._open < self.max_size:
+                    self._open += 1
+                    return self._new_connection(), False
+                self._cond.wait()
+
+    def release(self, conn, reusable=True):
+        with self._cond:
+            if reusable:
+                self._idle.append(conn)
+            else:
+                conn.close()
+                self._open -= 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._open -= len(self._idle)
+            self._idle = []
+
+
+class HarnessClient:
+    """Cliente HTTP medido, seguro para usar desde varios hilos"""
+
+    def __init__(self, base_url=BASE_URL, metrics=None, timeout=DEFAULT_TIMEOUT,
+                 max_connections=None, sample_sinks=None, resilience=None):
+        self.base_url = base_url.rstrip("/")
+        self.base_path = urlsplit(self.base_url).path
+        self.metrics = metrics if metrics is not None else MetricsCollector()
+        self.timeout = timeout
+        self.pool = ConnectionPool(self.base_url, max_connections, timeout)
+        # Callables que reciben cada Sample (p.ej. escritura de trazas)
+        self.sample_sinks = list(sample_sinks or [])
+        # Reintentos / circuit breakers (ver resiliencia.py); None = desactivado
+        self.resilience = resilience
+        self.tokens = {}
+        self.roles = {}
+        # Login y preparación hasta que warm_up() marque el régimen
+        self.stage = STAGE_SETUP
+
+    def login(self, username, password, role, alias=None):
+        """Login de usuario y almacenar token bajo `alias` (por defecto el rol)"""
+        alias = alias or role
+        self.roles[alias] = role
+        result = self.request(
+            "POST", "token/", json={"username": username, "password": password}
+        )
+        if result.status == 200 and isinstance(result.data, dict):
+            self.tokens[alias] = result.data.get("access")
+            return True
+        return False
+
+    def auth_header(self, alias):
+        """Obtiene header con token de autenticación"""
+        headers = {"Content-Type": "application/json"}
+        token = self.tokens.get(alias)
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _send(self, method, url, body, headers, phases):
+        """Una ida y vuelta sobre una conexión del pool; rellena `phases`"""
+        t0 = time.perf_counter()
+        conn, reused = self.pool.acquire()
+        t1 = time.perf_counter()
+        phases["acquire"] = (t1 - t0) * 1000
+        try:
+            if conn.sock is None:
+                conn.connect()
+                reused = False
+            t2 = time.perf_counter()
+            phases["connect"] = (t2 - t1) * 1000
+
+            conn.request(method, url, body=body, headers=headers)
+            t3 = time.perf_counter()
+            phases["send"] = (t3 - t2) * 1000
+
+            response = conn.getresponse()
+            t4 = time.perf_counter()
+            phases["ttfb"] = (t4 - t3) * 1000
+
+            raw = response.read()
+            phases["download"] = (time.perf_counter() - t4) * 1000
+        except STALE_CONNECTION_ERRORS as e:
+            self.pool.release(conn, reusable=False)
+            if reused:
+                raise StaleConnection(str(e)) from e
+            raise
+        except BaseException:
+            self.pool.release(conn, reusable=False)
+            raise
+        self.pool.release(conn, reusable=not response.will_close)
+        return response, raw, reused
+
+    def request(self, method, endpoint, alias=None, path_params=None,
+                json=None, params=None, headers=None, idempotent=False):
+        """
+        Ejecuta una llamada y la registra.
+
+        `endpoint` es la plantilla relativa a BASE_URL ("orders/{id}/");
+        `path_params` la completa. Las métricas se agrupan por plantilla.
+        Los errores de conexión/timeout se devuelven con status 0.
+
+        Con capa de resiliencia, cada intento es una muestra propia y
+        `Result.attempts` indica cuántos hubo. `idempotent=True` añade un
+        `Idempotency-Key` (el mismo en todos los intentos), lo que permite
+        reintentar POST/PATCH.
+        """
+        path = endpoint.format(**path_params) if path_params else endpoint
+        url = f"{self.base_path}/{path}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        body = json_dumps(json).encode() if json is not None else None
+
+        request_headers = self.auth_header(alias)
+        if headers:
+            request_headers.update(headers)
+        if idempotent:
+            request_headers.setdefault(IDEMPOTENCY_HEADER, uuid.uuid4().hex)
+
+        if self.resilience is None:
+            return self._request_once(method, endpoint, alias, url, body, request_headers)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            allowed, probe = self.resilience.allow(endpoint)
+            if not allowed:
+                result = self._short_circuited(method, endpoint, alias)
+            else:
+                result = self._request_once(method, endpoint, alias, url, body, request_headers)
+                self.resilience.record(endpoint, result.status, probe)
+            result.attempts = attempt
+            if not allowed:
+                return result
+            delay = self.resilience.next_delay(method, endpoint, request_headers, result, attempt)
+            if delay is None:
+                return result
+            time.sleep(delay)
+
+    def _short_circuited(self, method, endpoint, alias):
+        """Resultado de una llamada que el breaker no dejó salir (no se registra)"""
+        result = Result(0, None, "circuit breaker abierto")
+        result.sample = Sample(
+            started_at=time.time(),
+            endpoint=endpoint,
+            method=method,
+            role=self.roles.get(alias, "anon"),
+            status=0,
+            latency_ms=0.0,
+            error="CircuitOpen",
+            stage=self.stage,
+        )
+        return result
+
+    def _request_once(self, method, endpoint, alias, url, body, headers):
+        """Un intento: envía, mide fases, decodifica y registra la muestra"""
+        request_id = uuid.uuid4().hex
+        request_headers = dict(headers)
+        request_headers[REQUEST_ID_HEADER] = request_id
+
+        phases = {}
+        reused = False
+        raw = b""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            try:
+                response, raw, reused = self._send(method, url, body, request_headers, phases)
+            except StaleConnection as e:
+                # RemoteDisconnected no prueba que el servidor no la procesara:
+                # sólo se reenvía un GET o una request con Idempotency-Key; el
+                # resto se registra como fallida (status 0) con el error real
+                if method.upper() not in SAFE_METHODS and IDEMPOTENCY_HEADER not in headers:
+                    raise e.__cause__
+                phases = {}
+                response, raw, reused = self._send(method, url, body, request_headers, phases)
+
+            t = time.perf_counter()
+            text = raw.decode("utf-8", errors="replace")
+            try:
+                data = json_loads(text) if text else None
+            except ValueError:
+                data = None
+            phases["decode"] = (time.perf_counter() - t) * 1000
+
+            result = Result(response.status, data, text, response.msg)
+            server_request_id = next(
+                (response.getheader(h) for h in RESPONSE_ID_HEADERS if response.getheader(h)),
+                None,
+            )
+            server_timing = parse_server_timing(response.getheader("Server-Timing"))
+            error = None
+        except (OSError, http.client.HTTPException) as e:
+            # socket.timeout es OSError; también cubre conexión rechazada
+            result = Result(0, None, str(e))
+            server_request_id = None
+            server_timing = {}
+            error = "Timeout" if isinstance(e, socket.timeout) else type(e).__name__
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        result.sample = Sample(
+            started_at=started_at,
+            endpoint=endpoint,
+            method=method,
+            role=self.roles.get(alias, "anon"),
+            status=result.status,
+            latency_ms=latency_ms,
+            bytes=len(raw),
+            error=error,
+            phases=phases,
+            reused=reused,
+            request_id=request_id,
+            server_request_id=server_request_id,
+            server_timing=server_timing,
+            stage=self.stage,
+        )
+        self.metrics.record(result.sample)
+        for sink in self.sample_sinks:
+            sink(result.sample)
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Cierra las conexiones ociosas y los sinks que lo necesiten"""
+        self.pool.close()
+        for sink in self.sample_sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+class TraceWriter:
+    """
+    Escribe cada muestra como una línea JSON (fases, status, IDs de request)
+    para cruzarla con los logs/trazas del backend por `request_id`.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def __call__(self, sample):
+        line = json_dumps({
+            "ts": sample.started_at,
+            "stage": sample.stage,
+            "endpoint": sample.endpoint,
+            "method": sample.method,
+            "role": sample.role,
+            "status": sample.status,
+            "latency_ms": round(sample.latency_ms, 3),
+            "phases": {k: round(v, 3) for k, v in sample.phases.items()},
+            "reused": sample.reused,
+            "request_id": sample.request_id,
+            "server_request_id": sample.server_request_id,
+            "server_timing": sample.server_timing,
+            "error": sample.error,
+        })
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def add_connection_arguments(parser):
+    """Argumentos comunes de conexión/usuarios para los escenarios"""
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help=f"URL base de la API (default: {BASE_URL})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Timeout por request en segundos")
+    parser.add_argument("--conexiones", type=int, default=None,
+                        help="Máximo de conexiones del pool (default: sin límite)")
+    parser.add_argument("--trazas", default=None,
+                        help="Archivo JSONL donde escribir cada muestra con sus fases")
+    parser.add_argument("--muestras", default=None,
+                        help="Exportar todas las muestras crudas a .csv o binario columnar")
+    parser.add_argument("--muestras-bloque", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Muestras en memoria antes de volcarlas a disco")
+    parser.add_argument("--calentamiento", type=float, default=0,
+                        help="Segundos de calentamiento tras el login, fuera de las estadísticas")
+    parser.add_argument("--calentamiento-endpoints", default=WARMUP_ENDPOINTS,
+                        help="GETs separados por coma que se recorren al calentar")
+    parser.add_argument("--arranque-frio", type=int, default=0,
+                        help="Reportar aparte las primeras N requests (0 = no)")
+    parser.add_argument("--reintentos", type=int, default=0,
+                        help="Reintentos ante 429/502/503/504/timeout (0 = sin reintentos)")
+    parser.add_argument("--backoff-base-ms", type=float, default=100,
+                        help="Base del backoff exponencial con jitter")
+    parser.add_argument("--backoff-max-ms", type=float, default=5000,
+                        help="Tope de espera entre reintentos")
+    parser.add_argument("--breaker-fallos", type=int, default=0,
+                        help="Fallos seguidos que abren el breaker del endpoint (0 = sin breaker)")
+    parser.add_argument("--breaker-abierto-s", type=float, default=5.0,
+                        help="Segundos que el breaker queda abierto antes de probar")
+    parser.add_argument("--admin", default=":".join(DEFAULT_USERS["admin"]),
+                        help="Credenciales admin user:pass")
+    parser.add_argument("--manager", default=":".join(DEFAULT_USERS["manager"]),
+                        help="Credenciales manager user:pass")
+    parser.add_argument("--clientes", default=":".join(DEFAULT_USERS["cliente"]),
+                        help="Lista de clientes user:pass separados por coma")
+
+
+def client_from_args(args):
+    """Crea el HarnessClient a partir de los argumentos comunes"""
+    sinks = []
+    if args.trazas:
+        sinks.append(TraceWriter(args.trazas))
+    if args.muestras:
+        sinks.append(SampleRecorder(args.muestras, chunk_rows=args.muestras_bloque))
+    if args.arranque_frio:
+        sinks.append(ColdStartRecorder(args.arranque_frio))
+    resilience = None
+    if args.reintentos or args.breaker_fallos:
+        retry = None
+        if args.reintentos:
+            retry = RetryPolicy(args.reintentos, args.backoff_base_ms, args.backoff_max_ms)
+        resilience = Resilience(retry, args.breaker_fallos, args.breaker_abierto_s)
+    return HarnessClient(base_url=args.base_url, timeout=args.timeout,
+                         max_connections=args.conexiones, sample_sinks=sinks,
+                         resilience=resilience)
+
+
+def print_phase_report(metrics):
+    """Imprime el desglose de fases (p50/p95 ms) por endpoint"""
+    print_header("DESGLOSE POR FASES (p50/p95 ms)")
+    print_table(phase_columns(PHASES), metrics.phase_rows(PHASES))
+
+
+def print_resilience_report(client):
+    """Reintentos, abandonos y cortes de breaker por endpoint (si hay resiliencia)"""
+    if client.resilience is None:
+        return
+    print_resilience_stats(client.resilience.stats)
+
+
+def print_resilience_stats(stats):
+    """Tabla de un ResilienceStats (local o fusionado de varios workers)"""
+    print_header("RESILIENCIA")
+    print_table(["endpoint", "reintentos", "abandonos", "cortados", "aperturas breaker"],
+                stats.rows())
+
+
+def login_clients(client, credentials):
+    """Login de cada cliente; devuelve los alias autenticados (cliente_0, ...)"""
+    aliases = []
+    for i, (username, password) in enumerate(credentials):
+        alias = f"cliente_{i}"
+        if client.login(username, password, "cliente", alias=alias):
+            aliases.append(alias)
+    return aliases
@@ -0,0 +1,211 @@
+"""
+Escenario: contención de stock (venta flash)
+============================================
+
+Muchos clientes virtuales piden a la vez el mismo producto con poco stock,
+alternando `orders/` (como `create_test_order`) y `orders/create/` (como
+`orderService.createOrder` del frontend). Por cada nivel de concurrencia:
+
+1. (Opcional) el admin fija el stock inicial con PATCH `products/{id}/`
+2. Se lee el stock antes
+3. N clientes disparan su orden a la vez (cantidad 1)
+4. Se lee el stock después y se compara con las órdenes aceptadas
+
+Sobreventa: más órdenes aceptadas que stock disponible, o stock negativo.
+Descuadre: el stock no bajó exactamente lo aceptado.
+"""
+
+from .calentamiento import print_cold_start_report, warm_up
+from .cliente import (add_connection_arguments, client_from_args, login_clients, parse_credentials,
+                      print_phase_report)
+from .ejecutor import parse_levels, run_concurrent
+from .metricas import Histogram
+from .salida import Colors, print_error, print_header, print_info, print_success, print_table
+
+ORDER_ENDPOINTS = ("orders/", "orders/create/")
+ACCEPTED_STATUSES = (200, 201)
+
+
+def read_stock(client, product_id):
+    """Stock actual del producto (None si no se pudo leer)"""
+    result = client.request("GET", "products/{id}/", "admin", {"id": product_id})
+    if result.ok and isinstance(result.data, dict):
+        return result.data.get("stock")
+    return None
+
+
+def set_stock(client, product_id, stock):
+    """Fija el stock del producto como admin"""
+    result = client.request("PATCH", "products/{id}/", "admin", {"id": product_id},
+                            json={"stock": stock})
+    return result.ok
+
+
+def order_payload(product_id, endpoint):
+    """
+    Payload de una orden de 1 unidad: el de create_test_order para
+    `orders/` y el de getCartForAPI (CartContext.jsx) para `orders/create/`
+    """
+    if endpoint == "orders/create/":
+        return {
+            "items": [
+                {
+                    "product_id": product_id,
+                    "quantity": 1
+                }
+            ]
+        }
+    return {
+        "items": [
+            {
+                "product": product_id,
+                "quantity": 1
+            }
+        ],
+        "shipping_address": "Calle Principal 123, La Paz, Bolivia",
+        "payment_method": "CARD"
+    }
+
+
+def place_order(client, alias, product_id, endpoint):
+    """Crea una orden de 1 unidad con el payload propio del endpoint"""
+    return client.request("POST", endpoint, alias, json=order_payload(product_id, endpoint))
+
+
+def run_level(client, product_id, concurrency, aliases, initial_stock=None):
+    """Ejecuta un nivel de contención y devuelve su resultado"""
+    if initial_stock is not None and not set_stock(client, product_id, initial_stock):
+        print_error(f"No se pudo fijar stock={initial_stock} en producto {product_id}")
+
+    stock_before = read_stock(client, product_id)
+
+    def task(i):
+        alias = aliases[i % len(aliases)]
+        endpoint = ORDER_ENDPOINTS[i % len(ORDER_ENDPOINTS)]
+        return place_order(client, alias, product_id, endpoint)
+
+    results, elapsed = run_concurrent(concurrency, task)
+    stock_after = read_stock(client, product_id)
+
+    latency = Histogram()
+    accepted_by_endpoint = dict.fromkeys(ORDER_ENDPOINTS, 0)
+    rejected_by_endpoint = dict.fromkeys(ORDER_ENDPOINTS, 0)
+    accepted = rejected = errors = 0
+    for result in results:
+        latency.record(result.sample.latency_ms)
+        if result.status in ACCEPTED_STATUSES:
+            accepted += 1
+            accepted_by_endpoint[result.sample.endpoint] += 1
+        elif result.status == 0 or result.status >= 500:
+            errors += 1
+        else:
+            rejected += 1
+            rejected_by_endpoint[result.sample.endpoint] += 1
+
+    oversold = 0
+    consistent = None
+    if stock_before is not None:
+        oversold = max(0, accepted - stock_before)
+        if stock_after is not None:
+            oversold = max(oversold, -stock_after)
+            consistent = stock_before - stock_after == accepted
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(concurrency / elapsed, 2) if elapsed else None,
+        "latency": latency.summary(),
+        "accepted": accepted,
+        "accepted_by_endpoint": accepted_by_endpoint,
+        "rejected": rejected,
+        "rejected_by_endpoint": rejected_by_endpoint,
+        "errors": errors,
+        "stock_before": stock_before,
+        "stock_after": stock_after,
+        "oversold": oversold,
+        "consistent": consistent,
+    }
+
+
+def run_stock_contention(client, product_id, levels, aliases, initial_stock=None):
+    """Ejecuta todos los niveles de concurrencia en orden creciente"""
+    results = []
+    for concurrency in levels:
+        print_info(f"Nivel de contención: {concurrency} clientes simultáneos...")
+        results.append(run_level(client, product_id, concurrency, aliases, initial_stock))
+    return results
+
+
+def print_contention_report(results):
+    """Imprime la tabla de contención y las sobreventas detectadas"""
+    print_header("CONTENCIÓN DE STOCK - RESULTADOS")
+    rows = []
+    for r in results:
+        rows.append([
+            r["concurrency"], r["throughput_rps"], r["latency"]["p50"],
+            r["latency"]["p95"], r["latency"]["p99"], r["latency"]["max"],
+            r["accepted"], r["rejected"], r["errors"],
+            r["stock_before"], r["stock_after"], r["oversold"],
+        ])
+    print_table(["clientes", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms",
+                 "aceptadas", "rechazadas", "errores", "stock antes",
+                 "stock después", "sobreventa"], rows)
+    print()
+
+    # Un endpoint que rechaza todo (p.ej. payload inválido) no compite por el stock
+    print_header("POR ENDPOINT (aceptadas/rechazadas)")
+    rows = []
+    for r in results:
+        rows.append([r["concurrency"]] + [
+            f"{r['accepted_by_endpoint'][e]}/{r['rejected_by_endpoint'][e]}"
+            for e in ORDER_ENDPOINTS
+        ])
+    print_table(["clientes"] + list(ORDER_ENDPOINTS), rows)
+    print()
+
+    oversold = [r for r in results if r["oversold"]]
+    inconsistent = [r for r in results if r["consistent"] is False]
+    if oversold:
+        for r in oversold:
+            print_error(f"SOBREVENTA con {r['concurrency']} clientes: "
+                        f"{r['accepted']} aceptadas con stock {r['stock_before']} "
+                        f"(stock final {r['stock_after']})")
+    else:
+        print_success("Sin sobreventa detectada")
+    for r in inconsistent:
+        print_info(f"{Colors.BOLD}Descuadre{Colors.END} con {r['concurrency']} clientes: "
+                   f"stock bajó {r['stock_before'] - r['stock_after']}, "
+                   f"aceptadas {r['accepted']}")
+
+
+def add_arguments(parser):
+    add_connection_arguments(parser)
+    parser.add_argument("--producto", type=int, required=True,
+                        help="ID del producto a disputar")
+    parser.add_argument("--niveles", type=parse_levels, default=[1, 5, 10, 25, 50],
+                        help="Niveles de concurrencia, p.ej. 1,5,10,25,50")
+    parser.add_argument("--stock-inicial", type=int, default=None,
+                        help="Stock a fijar antes de cada nivel (si se omite, no se toca)")
+
+
+def run(args):
+    print_header("ESCENARIO: CONTENCIÓN DE STOCK")
+    with client_from_args(args) as client:
+        username, _, password = args.admin.partition(":")
+        if not client.login(username, password, "admin"):
+            print_error("No se pudo autenticar al admin")
+            return 1
+
+        aliases = login_clients(client, parse_credentials(args.clientes))
+        if not aliases:
+            print_error("No se pudo autenticar a ningún cliente")
+            return 1
+        print_success(f"{len(aliases)} cliente(s) autenticado(s)")
+        warm_up(client, args, aliases)
+
+        results = run_stock_contention(client, args.producto, args.niveles, aliases,
+                                       args.stock_inicial)
+        print_contention_report(results)
+        print_phase_report(client.metrics)
+        print_cold_start_report(client)
+        return 1 if any(r["oversold"] for r in results) else 0
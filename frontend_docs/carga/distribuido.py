@@ -0,0 +1,360 @@
+"""
+Modo distribuido: coordinador + workers
+=======================================
+
+Una sola máquina no genera suficientes flujos para saturar el backend de
+producción, así que el flujo de devoluciones se reparte entre varios
+workers (uno por máquina de carga):
+
+    # máquina coordinadora
+    python -m carga coordinador --workers 3 --host 0.0.0.0 --token s3cr3t \\
+        --puerto 9500 --duracion 60 --semilla "cliente_{n}:pass" --semilla-rango 0:150
+
+    # cada máquina de carga
+    python -m carga worker --coordinador 10.0.0.5:9500 --token s3cr3t
+
+Por defecto el coordinador sólo escucha en 127.0.0.1: en localhost basta
+con lanzar el coordinador y los workers en varias terminales. La config
+incluye las credenciales de admin y manager, así que al escuchar en la red
+se exige --token: un `hello` sin el token correcto se descarta.
+
+Protocolo (TCP, un mensaje JSON por línea):
+
+    worker -> hello   {"name", "token"}
+    coord  -> config  {"config": {...}, "slice": [inicio, fin]}
+    worker -> ready   {"clients"}                  (tras hacer login)
+    coord  -> start   {"start_at": epoch}          (todos arrancan a la vez)
+    worker -> metrics {"metrics", "flows", "resilience"}  (deltas cada --intervalo s)
+    worker -> done    {"metrics", "flows", "resilience", "elapsed_s", "cold_start"}
+    worker -> error   {"message"}
+
+Los deltas son snapshots de histogramas (`MetricsCollector.drain`), que
+el coordinador fusiona en un único reporte. Con --arranque-frio cada
+worker envía en `done` sus primeras N muestras completas y el coordinador
+las compara con el régimen de todos.
+"""
+
+import hmac
+import ipaddress
+import json
+import queue
+import socket
+import threading
+import time
+from dataclasses import asdict
+
+from .calentamiento import cold_start_recorder, print_cold_start_samples, warm_up
+from .cliente import Sample, client_from_args, login_clients, print_resilience_stats
+from .flujo_devoluciones import (FlowStats, ReturnsFlow, add_flow_arguments, find_product,
+                                 login_staff, parse_range, print_flow_report, run_flows,
+                                 seeded_credentials)
+from .metricas import MetricsCollector
+from .muestras import DEFAULT_CHUNK_ROWS
+from .resiliencia import ResilienceStats
+from .salida import print_error, print_header, print_info, print_success, print_table
+
+DEFAULT_PORT = 9500
+# Margen para que todos los workers reciban `start` antes de arrancar
+START_DELAY_S = 2.0
+# Plazo para que un peer recién conectado envíe su `hello`
+HELLO_TIMEOUT_S = 5.0
+
+# Opciones del flujo que el coordinador reenvía a los workers
+FORWARDED_OPTIONS = ("base_url", "timeout", "conexiones", "reintentos", "backoff_base_ms",
+                     "backoff_max_ms", "breaker_fallos", "breaker_abierto_s", "admin",
+                     "manager", "producto", "duracion", "calentamiento",
+                     "calentamiento_endpoints", "arranque_frio")
+
+
+def send_message(stream, message_type, **payload):
+    """Escribe un mensaje JSON terminado en salto de línea"""
+    payload["type"] = message_type
+    stream.write(json.dumps(payload).encode() + b"\n")
+    stream.flush()
+
+
+def read_message(stream):
+    """Lee un mensaje; None si el otro extremo cerró la conexión"""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def split_range(start, end, parts):
+    """Reparte [start, end) en `parts` tramos contiguos lo más parejos posible"""
+    total = end - start
+    slices = []
+    for i in range(parts):
+        lo = start + total * i // parts
+        hi = start + total * (i + 1) // parts
+        slices.append([lo, hi])
+    return slices
+
+
+class _WorkerConnection:
+    """Lado coordinador de la conexión con un worker"""
+
+    def __init__(self, sock, address, inbox):
+        self.sock = sock
+        self.address = address
+        self.stream = sock.makefile("rwb")
+        self.name = f"{address[0]}:{address[1]}"
+        self.clients = 0
+        self._inbox = inbox
+
+    def send(self, message_type, **payload):
+        send_message(self.stream, message_type, **payload)
+
+    def read(self):
+        return read_message(self.stream)
+
+    def pump(self):
+        """Hilo lector: reenvía todos los mensajes al inbox del coordinador"""
+        while True:
+            try:
+                message = self.read()
+            except (OSError, ValueError):
+                message = None
+            if message is None:
+                self._inbox.put((self, {"type": "closed"}))
+                return
+            self._inbox.put((self, message))
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.sock.close()
+
+
+def _read_hello(worker):
+    """El `hello` de un peer recién conectado, o None si no envía uno válido a tiempo"""
+    worker.sock.settimeout(HELLO_TIMEOUT_S)
+    try:
+        hello = worker.read()
+    except (OSError, ValueError):
+        return None
+    if not isinstance(hello, dict) or hello.get("type") != "hello":
+        return None
+    worker.sock.settimeout(None)
+    return hello
+
+
+def run_coordinator(args):
+    """Espera a los workers, reparte usuarios, sincroniza el inicio y junta métricas"""
+    print_header("MODO DISTRIBUIDO: COORDINADOR")
+    if not args.semilla:
+        print_error("El modo distribuido necesita --semilla para repartir usuarios")
+        return 1
+    if not args.token and not _is_loopback(args.host):
+        print_error("Para escuchar fuera de 127.0.0.1 hace falta --token: "
+                    "la config incluye credenciales")
+        return 1
+    config = {name: getattr(args, name) for name in FORWARDED_OPTIONS}
+    config["semilla"] = args.semilla
+    config["intervalo"] = args.intervalo
+    # Las trazas JSONL y las muestras crudas son locales a cada máquina
+    config["trazas"] = None
+    config["muestras"] = None
+    config["muestras_bloque"] = DEFAULT_CHUNK_ROWS
+    slices = split_range(*parse_range(args.semilla_rango), args.workers)
+
+    server = socket.create_server((args.host, args.puerto))
+    print_info(f"Esperando {args.workers} worker(s) en {args.host}:{args.puerto}...")
+
+    inbox = queue.Queue()
+    workers = []
+    try:
+        while len(workers) < args.workers:
+            sock, address = server.accept()
+            worker = _WorkerConnection(sock, address, inbox)
+            hello = _read_hello(worker)
+            if hello is None:
+                print_error(f"Hello inválido desde {worker.name}: conexión descartada")
+                worker.close()
+                continue
+            token = str(hello.get("token") or "").encode()
+            if args.token and not hmac.compare_digest(token, args.token.encode()):
+                print_error(f"Token inválido desde {worker.name}: conexión descartada")
+                worker.close()
+                continue
+            worker.name = str(hello.get("name") or worker.name)
+            workers.append(worker)
+            print_success(f"Worker conectado: {worker.name}")
+    finally:
+        server.close()
+
+    for worker, user_slice in zip(workers, slices):
+        worker.send("config", config=config, slice=user_slice)
+        threading.Thread(target=worker.pump, daemon=True).start()
+
+    # Todos deben hacer login antes de arrancar
+    pending = set(workers)
+    while pending:
+        worker, message = inbox.get()
+        if message["type"] == "ready":
+            worker.clients = message.get("clients", 0)
+            pending.discard(worker)
+            print_success(f"{worker.name} listo con {worker.clients} cliente(s)")
+        elif message["type"] in ("error", "closed"):
+            print_error(f"{worker.name} falló antes de arrancar: {message.get('message', 'conexión cerrada')}")
+            for w in workers:
+                w.close()
+            return 1
+
+    start_at = time.time() + START_DELAY_S
+    for worker in workers:
+        worker.send("start", start_at=start_at)
+    print_info(f"Carga sincronizada: inicio en {START_DELAY_S} s, duración {args.duracion} s")
+
+    metrics = MetricsCollector()
+    flows = FlowStats()
+    resilience = ResilienceStats()
+    per_worker = {worker: FlowStats() for worker in workers}
+    cold_samples = []
+    elapsed = 0.0
+    last_progress = time.perf_counter()
+    running = set(workers)
+    while running:
+        worker, message = inbox.get()
+        if worker not in running:
+            continue
+        if message["type"] in ("metrics", "done"):
+            metrics.merge_snapshot(message["metrics"])
+            flows.merge_dict(message["flows"])
+            per_worker[worker].merge_dict(message["flows"])
+            resilience.merge_dict(message.get("resilience", {}))
+        if message["type"] == "done":
+            elapsed = max(elapsed, message.get("elapsed_s", 0.0))
+            cold_samples.extend(Sample(**data) for data in message.get("cold_start", []))
+            running.discard(worker)
+        elif message["type"] in ("error", "closed"):
+            print_error(f"{worker.name} se desconectó: {message.get('message', 'conexión cerrada')}")
+            running.discard(worker)
+
+        if time.perf_counter() - last_progress >= args.intervalo:
+            last_progress = time.perf_counter()
+            overall = metrics.histogram()
+            p95 = overall.percentile(95)
+            print_info(f"Flujos completados: {flows.completed}, "
+                       f"requests: {overall.count}, "
+                       f"p95: {p95 and round(p95, 1)} ms")
+
+    for worker in workers:
+        worker.close()
+
+    print_flow_report(metrics, flows.summary(elapsed, metrics))
+    print_header("POR WORKER")
+    print_table(["worker", "usuarios", "iniciados", "completados"],
+                [[w.name, w.clients, per_worker[w].started, per_worker[w].completed]
+                 for w in workers])
+    if args.reintentos or args.breaker_fallos:
+        print_resilience_stats(resilience)
+    print_cold_start_samples(cold_samples, metrics)
+    return 0
+
+
+def run_worker(args):
+    """Se conecta al coordinador y ejecuta su tramo de usuarios semilla"""
+    print_header("MODO DISTRIBUIDO: WORKER")
+    host, _, port = args.coordinador.rpartition(":")
+    sock = socket.create_connection((host, int(port)))
+    stream = sock.makefile("rwb")
+    name = args.nombre or f"{socket.gethostname()}-{sock.getsockname()[1]}"
+    send_message(stream, "hello", name=name, token=args.token)
+
+    message = read_message(stream)
+    if not message or message["type"] != "config":
+        print_error("El coordinador no envió configuración")
+        return 1
+    config = _ConfigArgs(message["config"])
+    config.muestras = args.muestras
+    start, end = message["slice"]
+    print_info(f"Tramo asignado: usuarios {start}..{end - 1}")
+
+    with client_from_args(config) as client:
+        aliases = []
+        if login_staff(client, config):
+            aliases = login_clients(client, seeded_credentials(config.semilla, start, end))
+        product_id = config.producto or find_product(client)
+        if not aliases or product_id is None:
+            send_message(stream, "error", message="login o producto fallido")
+            return 1
+        # El login y el calentamiento no son parte de la carga medida
+        warm_up(client, config, aliases)
+        send_message(stream, "ready", clients=len(aliases))
+
+        message = read_message(stream)
+        if not message or message["type"] != "start":
+            print_error("El coordinador canceló la prueba")
+            return 1
+
+        flows = FlowStats()
+        outcome = {}
+
+        def load():
+            outcome["elapsed_s"] = run_flows(ReturnsFlow(client, product_id), aliases,
+                                             config.duracion, flows, start_at=message["start_at"])
+
+        runner = threading.Thread(target=load, daemon=True)
+        runner.start()
+        while runner.is_alive():
+            runner.join(config.intervalo)
+            if runner.is_alive():
+                send_message(stream, "metrics", metrics=client.metrics.drain(),
+                             flows=flows.drain(), resilience=_drain_resilience(client))
+
+        # El régimen ya se fue en los deltas: la comparación la hace el coordinador
+        recorder = cold_start_recorder(client)
+        cold_start = [asdict(sample) for sample in recorder.samples] if recorder else []
+        send_message(stream, "done", metrics=client.metrics.drain(), flows=flows.drain(),
+                     resilience=_drain_resilience(client), elapsed_s=outcome.get("elapsed_s", 0.0),
+                     cold_start=cold_start)
+        print_success(f"Worker {name} terminó")
+        stream.close()
+        sock.close()
+        return 0
+
+
+def _drain_resilience(client):
+    return client.resilience.stats.drain() if client.resilience else {}
+
+
+class _ConfigArgs:
+    """Config reenviada por el coordinador, con acceso por atributo como args"""
+
+    def __init__(self, config):
+        self.__dict__.update(config)
+
+
+def add_coordinator_arguments(parser):
+    add_flow_arguments(parser)
+    parser.add_argument("--workers", type=int, required=True,
+                        help="Cantidad de workers a esperar")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Interfaz donde escuchar (fuera de localhost exige --token)")
+    parser.add_argument("--token", default=None,
+                        help="Secreto compartido que los workers deben enviar en hello")
+    parser.add_argument("--puerto", type=int, default=DEFAULT_PORT,
+                        help="Puerto del coordinador")
+    parser.add_argument("--intervalo", type=float, default=5.0,
+                        help="Segundos entre envíos de métricas parciales")
+
+
+def add_worker_arguments(parser):
+    parser.add_argument("--coordinador", required=True,
+                        help="host:puerto del coordinador")
+    parser.add_argument("--nombre", default=None,
+                        help="Nombre del worker en el reporte")
+    parser.add_argument("--token", default=None,
+                        help="Secreto compartido con el coordinador")
+    parser.add_argument("--muestras", default=None,
+                        help="Exportar las muestras crudas de este worker (.csv o binario)")
@@ -0,0 +1,39 @@
+"""
+Ejecución concurrente de clientes virtuales
+===========================================
+
+Cada cliente virtual es un hilo. Todos esperan en una barrera y arrancan
+a la vez, que es lo que pasa en una venta flash: el pico llega junto.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_concurrent(n_clients, task):
+    """
+    Ejecuta task(i) en n_clients hilos que arrancan a la vez.
+
+    Devuelve (resultados en orden de i, segundos de pared desde la
+    liberación de la barrera hasta que termina el último cliente).
+    """
+    barrier = threading.Barrier(n_clients + 1)
+
+    def worker(i):
+        barrier.wait()
+        return task(i)
+
+    with ThreadPoolExecutor(max_workers=n_clients) as pool:
+        futures = [pool.submit(worker, i) for i in range(n_clients)]
+        barrier.wait()
+        start = time.perf_counter()
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def parse_levels(value):
+    """Convierte "1,5,10" en [1, 5, 10]"""
+    return [int(v) for v in value.split(",") if v.strip()]
@@ -0,0 +1,318 @@
+"""
+Escenario: flujo de devoluciones bajo carga
+===========================================
+
+El flujo de aprobación de `test_flujo_completo_devoluciones.py`, repetido
+en bucle por muchos clientes virtuales a la vez:
+
+1. Cliente crea una orden de 1 unidad                  (orders/)
+2. Admin la marca como DELIVERED                       (orders/{id}/)
+3. Cliente solicita la devolución                      (deliveries/returns/)
+4. Manager la envía a evaluación                       (.../send_to_evaluation/)
+5. Manager la aprueba con reembolso a billetera        (.../approve/)
+6. Cliente consulta su billetera                       (users/wallets/my_wallet/)
+
+Un flujo sólo cuenta como completado si llegan bien los 6 pasos. Cada
+cliente virtual es un usuario semilla distinto (`--semilla`), para que las
+órdenes y billeteras no se pisen entre sí.
+"""
+
+import threading
+import time
+
+from .calentamiento import print_cold_start_report, warm_up
+from .cliente import (add_connection_arguments, client_from_args, login_clients, parse_credentials,
+                      print_phase_report, print_resilience_report)
+from .metricas import Histogram, REPORT_COLUMNS
+from .salida import print_data, print_error, print_header, print_info, print_success, print_table
+
+FLOW_STEPS = ("create_order", "deliver", "request_return", "send_to_evaluation",
+              "approve", "wallet")
+
+# El script usa ambos: orders/{id}/ y, si falla, el endpoint de admin
+DELIVER_ENDPOINTS = ("orders/{id}/", "orders/admin/{id}/")
+
+# Un flujo cortado por un circuit breaker abierto se reporta aparte, y el
+# cliente virtual espera un poco antes de reintentar (como un usuario que
+# ve la página de error) en vez de girar en vacío contra el breaker
+BREAKER_SUFFIX = " (breaker)"
+BREAKER_PAUSE_S = 0.1
+
+
+class FlowStats:
+    """Contadores de flujos completos, seguros entre hilos y fusionables"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.completed = 0
+        self.failed = {}
+        self.flow_latency = Histogram()
+
+    def record(self, failed_step, flow_ms):
+        with self._lock:
+            self.started += 1
+            if failed_step is None:
+                self.completed += 1
+                self.flow_latency.record(flow_ms)
+            else:
+                self.failed[failed_step] = self.failed.get(failed_step, 0) + 1
+
+    def _as_dict(self):
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "failed": dict(self.failed),
+            "flow_latency": self.flow_latency.to_dict(),
+        }
+
+    def to_dict(self):
+        with self._lock:
+            return self._as_dict()
+
+    def drain(self):
+        """Devuelve lo acumulado (to_dict) y reinicia los contadores"""
+        with self._lock:
+            data = self._as_dict()
+            self.started = self.completed = 0
+            self.failed = {}
+            self.flow_latency = Histogram()
+            return data
+
+    def merge_dict(self, data):
+        with self._lock:
+            self.started += data.get("started", 0)
+            self.completed += data.get("completed", 0)
+            for step, n in data.get("failed", {}).items():
+                self.failed[step] = self.failed.get(step, 0) + n
+            self.flow_latency.merge(Histogram.from_dict(data["flow_latency"]))
+
+    def summary(self, elapsed_s, metrics=None):
+        """
+        Goodput (flujos completados/s) y, si se pasa `metrics`, throughput
+        bruto: todas las requests enviadas, reintentos incluidos.
+        """
+        data = self.to_dict()
+        summary = {
+            "started": data["started"],
+            "completed": data["completed"],
+            "completed_per_s": _per_s(data["completed"], elapsed_s),
+            "failed_by_step": data["failed"],
+            "flow_latency_ms": self.flow_latency.summary(),
+        }
+        if metrics is not None:
+            sent, ok = metrics.status_totals()
+            summary["requests_sent"] = sent
+            summary["requests_per_s"] = _per_s(sent, elapsed_s)
+            summary["successful_requests_per_s"] = _per_s(ok, elapsed_s)
+            summary["requests_per_completed_flow"] = (
+                round(sent / data["completed"], 2) if data["completed"] else None)
+        return summary
+
+
+def _per_s(count, elapsed_s):
+    return round(count / elapsed_s, 2) if elapsed_s else None
+
+
+class ReturnsFlow:
+    """Un flujo completo de devolución aprobada"""
+
+    def __init__(self, client, product_id, manager="manager", admin="admin"):
+        self.client = client
+        self.product_id = product_id
+        self.manager = manager
+        self.admin = admin
+        self._deliver_endpoint = None
+
+    def _deliver(self, order_id):
+        endpoints = [self._deliver_endpoint] if self._deliver_endpoint else DELIVER_ENDPOINTS
+        for endpoint in endpoints:
+            result = self.client.request("PATCH", endpoint, self.admin, {"id": order_id},
+                                         json={"status": "DELIVERED"}, idempotent=True)
+            if result.status == 200:
+                self._deliver_endpoint = endpoint
+                return result
+        return result
+
+    @staticmethod
+    def _failed(step, result):
+        if result.sample is not None and result.sample.error == "CircuitOpen":
+            return step + BREAKER_SUFFIX
+        return step
+
+    def open_return(self, alias):
+        """
+        Pasos 1-3: orden entregada + devolución solicitada (REQUESTED).
+        Devuelve (return_id, None) o (None, paso fallido).
+        """
+        client = self.client
+
+        result = client.request("POST", "orders/", alias, json={
+            "items": [{"product": self.product_id, "quantity": 1}],
+            "shipping_address": "Calle Principal 123, La Paz, Bolivia",
+            "payment_method": "CARD"
+        })
+        if result.status != 201:
+            return None, self._failed("create_order", result)
+        order_id = result.data["id"]
+
+        result = self._deliver(order_id)
+        if result.status != 200:
+            return None, self._failed("deliver", result)
+
+        result = client.request("POST", "deliveries/returns/", alias, json={
+            "order_id": order_id,
+            "product_id": self.product_id,
+            "quantity": 1,
+            "reason": "DEFECTIVE",
+            "description": "Prueba de carga: el producto llegó con defectos de fábrica.",
+            "refund_method": "WALLET"
+        })
+        if result.status != 201:
+            return None, self._failed("request_return", result)
+        return result.data["id"], None
+
+    def run_once(self, alias):
+        """Ejecuta los 6 pasos; devuelve el paso fallido o None"""
+        client = self.client
+
+        return_id, failed_step = self.open_return(alias)
+        if failed_step:
+            return failed_step
+
+        # Transiciones con Idempotency-Key: se pueden reintentar bajo sobrecarga
+        result = client.request("POST", "deliveries/returns/{id}/send_to_evaluation/",
+                                self.manager, {"id": return_id}, json={}, idempotent=True)
+        if result.status != 200:
+            return self._failed("send_to_evaluation", result)
+
+        result = client.request("POST", "deliveries/returns/{id}/approve/",
+                                self.manager, {"id": return_id}, json={
+                                    "evaluation_notes": "Prueba de carga: defecto verificado."
+                                }, idempotent=True)
+        if result.status != 200:
+            return self._failed("approve", result)
+
+        result = client.request("GET", "users/wallets/my_wallet/", alias)
+        if result.status != 200:
+            return self._failed("wallet", result)
+        return None
+
+
+def find_product(client, admin="admin"):
+    """Primer producto del catálogo (igual que get_existing_product)"""
+    result = client.request("GET", "products/", admin)
+    if not result.ok:
+        return None
+    data = result.data
+    results = data.get('results', data) if isinstance(data, dict) else data
+    return results[0]['id'] if results else None
+
+
+def run_flows(flow, aliases, duration_s, stats, start_at=None, stop_event=None):
+    """
+    Un hilo por alias repitiendo el flujo hasta `duration_s` segundos
+    después de `start_at` (epoch; por defecto ahora) o hasta `stop_event`.
+    Devuelve los segundos de pared transcurridos.
+    """
+    if start_at is not None:
+        time.sleep(max(0.0, start_at - time.time()))
+    stop_event = stop_event or threading.Event()
+    deadline = time.perf_counter() + duration_s
+
+    def virtual_user(alias):
+        while not stop_event.is_set() and time.perf_counter() < deadline:
+            t = time.perf_counter()
+            failed_step = flow.run_once(alias)
+            stats.record(failed_step, (time.perf_counter() - t) * 1000)
+            if failed_step and failed_step.endswith(BREAKER_SUFFIX):
+                stop_event.wait(BREAKER_PAUSE_S)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=virtual_user, args=(alias,), daemon=True)
+               for alias in aliases]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def login_staff(client, args):
+    """Login de admin y manager con las credenciales de los argumentos"""
+    for role, credentials in (("admin", args.admin), ("manager", args.manager)):
+        username, _, password = credentials.partition(":")
+        if not client.login(username, password, role):
+            print_error(f"No se pudo autenticar al {role}")
+            return False
+    return True
+
+
+def print_flow_report(metrics, summary):
+    """Reporte final: tabla por endpoint, fases y resumen de flujos"""
+    print_header("FLUJO DE DEVOLUCIONES - RESULTADOS")
+    print_table(REPORT_COLUMNS, metrics.report_rows())
+    print()
+    print_data("Flujos", summary)
+    print_phase_report(metrics)
+
+
+def add_flow_arguments(parser):
+    """Argumentos del flujo, compartidos con el modo coordinador"""
+    add_connection_arguments(parser)
+    parser.add_argument("--producto", type=int, default=None,
+                        help="ID del producto (default: el primero del catálogo)")
+    parser.add_argument("--duracion", type=float, default=30,
+                        help="Segundos de carga")
+    parser.add_argument("--semilla", default=None,
+                        help="Patrón de usuarios semilla user:pass con {n}, p.ej. cliente_{n}:pass")
+    parser.add_argument("--semilla-rango", default="0:10",
+                        help="Rango [inicio:fin) de {n} para --semilla")
+
+
+def add_arguments(parser):
+    add_flow_arguments(parser)
+
+
+def parse_range(value):
+    """Convierte "0:50" en (0, 50)"""
+    start, _, end = value.partition(":")
+    return int(start), int(end)
+
+
+def seeded_credentials(pattern, start, end):
+    """Credenciales de los usuarios semilla {n} en [start, end)"""
+    username, _, password = pattern.partition(":")
+    return [(username.format(n=n), password.format(n=n)) for n in range(start, end)]
+
+
+def run(args):
+    print_header("ESCENARIO: FLUJO DE DEVOLUCIONES BAJO CARGA")
+    with client_from_args(args) as client:
+        if not login_staff(client, args):
+            return 1
+
+        if args.semilla:
+            credentials = seeded_credentials(args.semilla, *parse_range(args.semilla_rango))
+        else:
+            credentials = parse_credentials(args.clientes)
+        aliases = login_clients(client, credentials)
+        if not aliases:
+            print_error("No se pudo autenticar a ningún cliente")
+            return 1
+        print_success(f"{len(aliases)} cliente(s) autenticado(s)")
+
+        product_id = args.producto or find_product(client)
+        if product_id is None:
+            print_error("No hay productos en la base de datos")
+            return 1
+        print_info(f"Producto {product_id}, {args.duracion} s de carga...")
+
+        # El login (y el calentamiento) no son parte de la carga medida
+        warm_up(client, args, aliases)
+        stats = FlowStats()
+        elapsed = run_flows(ReturnsFlow(client, product_id), aliases, args.duracion, stats)
+        print_flow_report(client.metrics, stats.summary(elapsed, client.metrics))
+        print_resilience_report(client)
+        print_cold_start_report(client)
+        return 0
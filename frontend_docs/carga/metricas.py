@@ -0,0 +1,322 @@
+"""
+Métricas del harness de carga
+=============================
+
+- Histogram: histograma logarítmico de latencias (ms), ~2% de error relativo,
+  serializable y fusionable (se puede sumar el de varios hilos o procesos).
+- MetricsCollector: agrupa muestras por plantilla de endpoint
+  (p.ej. "orders/{id}/") y es seguro entre hilos.
+- ColdStartRecorder: guarda completas las primeras N muestras (arranque
+  en frío), aparte de las estadísticas de régimen.
+"""
+
+import math
+import threading
+
+# Etapa de la corrida en que se toma cada muestra (ver calentamiento.py)
+STAGE_SETUP = "arranque"
+STAGE_WARMUP = "calentamiento"
+STAGE_STEADY = "regimen"
+
+
+class Histogram:
+    """Histograma logarítmico de latencias en milisegundos"""
+
+    GROWTH = 1.02
+    # Resolución mínima: 1 microsegundo
+    UNIT_MS = 0.001
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def _index(cls, value_ms):
+        scaled = value_ms / cls.UNIT_MS
+        if scaled <= 1:
+            return 0
+        return int(math.log(scaled) / math.log(cls.GROWTH))
+
+    @classmethod
+    def _value(cls, index):
+        # Punto medio (geométrico) del bucket
+        return cls.UNIT_MS * cls.GROWTH ** (index + 0.5)
+
+    def record(self, value_ms):
+        """Registra una latencia"""
+        index = self._index(value_ms)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        if self.min is None or value_ms < self.min:
+            self.min = value_ms
+        if self.max is None or value_ms > self.max:
+            self.max = value_ms
+
+    def merge(self, other):
+        """Suma otro histograma a este"""
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def percentile(self, p):
+        """Percentil p (0-100). Devuelve None si no hay muestras"""
+        if not self.count:
+            return None
+        if p >= 100:
+            return self.max
+        target = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """Resumen estándar (ms) para reportes"""
+        return {
+            "count": self.count,
+            "mean": _round(self.mean),
+            "p50": _round(self.percentile(50)),
+            "p95": _round(self.percentile(95)),
+            "p99": _round(self.percentile(99)),
+            "max": _round(self.max),
+        }
+
+    def to_dict(self):
+        return {
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls()
+        hist.buckets = {int(k): v for k, v in data.get("buckets", {}).items()}
+        hist.count = data.get("count", 0)
+        hist.total = data.get("total", 0.0)
+        hist.min = data.get("min")
+        hist.max = data.get("max")
+        return hist
+
+
+class EndpointStats:
+    """Estadísticas acumuladas de una plantilla de endpoint"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = {}
+        self.bytes = 0
+        self.reused = 0
+        # Fase -> Histogram (acquire, connect, send, ttfb, download, decode)
+        self.phases = {}
+        # Métrica de Server-Timing -> Histogram
+        self.server = {}
+
+    def record(self, sample):
+        self.latency.record(sample.latency_ms)
+        key = str(sample.status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        self.bytes += sample.bytes
+        self.reused += 1 if sample.reused else 0
+        _record_into(self.phases, sample.phases)
+        _record_into(self.server, sample.server_timing)
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        for key, n in other.statuses.items():
+            self.statuses[key] = self.statuses.get(key, 0) + n
+        self.bytes += other.bytes
+        self.reused += other.reused
+        _merge_into(self.phases, other.phases)
+        _merge_into(self.server, other.server)
+        return self
+
+    @property
+    def errors(self):
+        """Conexión fallida (status 0) o respuestas 5xx"""
+        return sum(n for key, n in self.statuses.items()
+                   if key == "0" or key.startswith("5"))
+
+    def to_dict(self):
+        return {
+            "latency": self.latency.to_dict(),
+            "statuses": dict(self.statuses),
+            "bytes": self.bytes,
+            "reused": self.reused,
+            "phases": {k: h.to_dict() for k, h in self.phases.items()},
+            "server": {k: h.to_dict() for k, h in self.server.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.latency = Histogram.from_dict(data["latency"])
+        stats.statuses = dict(data.get("statuses", {}))
+        stats.bytes = data.get("bytes", 0)
+        stats.reused = data.get("reused", 0)
+        stats.phases = {k: Histogram.from_dict(h) for k, h in data.get("phases", {}).items()}
+        stats.server = {k: Histogram.from_dict(h) for k, h in data.get("server", {}).items()}
+        return stats
+
+
+class MetricsCollector:
+    """Colector de muestras por endpoint, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, sample):
+        with self._lock:
+            stats = self.endpoints.get(sample.endpoint)
+            if stats is None:
+                stats = self.endpoints[sample.endpoint] = EndpointStats()
+            stats.record(sample)
+
+    def histogram(self, endpoint=None):
+        """Histograma de un endpoint, o de todos si endpoint es None"""
+        with self._lock:
+            merged = Histogram()
+            for name, stats in self.endpoints.items():
+                if endpoint is None or name == endpoint:
+                    merged.merge(stats.latency)
+            return merged
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def snapshot(self):
+        """Copia serializable (dict) del estado actual"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self.endpoints.items()}
+
+    def drain(self):
+        """Snapshot de lo acumulado desde el último drain, y reinicia"""
+        with self._lock:
+            snapshot = {name: stats.to_dict() for name, stats in self.endpoints.items()}
+            self.endpoints = {}
+            return snapshot
+
+    def merge_snapshot(self, snapshot):
+        """Fusiona un snapshot (p.ej. recibido de otro proceso)"""
+        with self._lock:
+            for name, data in snapshot.items():
+                incoming = EndpointStats.from_dict(data)
+                if name in self.endpoints:
+                    self.endpoints[name].merge(incoming)
+                else:
+                    self.endpoints[name] = incoming
+
+    def status_totals(self):
+        """Requests enviadas y exitosas (2xx) sumando todos los endpoints"""
+        with self._lock:
+            sent = ok = 0
+            for stats in self.endpoints.values():
+                for key, n in stats.statuses.items():
+                    sent += n
+                    if key.startswith("2"):
+                        ok += n
+            return sent, ok
+
+    def report_rows(self):
+        """Filas para print_table: endpoint, n, errores, p50, p95, p99, max"""
+        with self._lock:
+            rows = []
+            for name in sorted(self.endpoints):
+                stats = self.endpoints[name]
+                s = stats.latency.summary()
+                rows.append([name, s["count"], stats.errors,
+                             s["p50"], s["p95"], s["p99"], s["max"]])
+            return rows
+
+    def phase_rows(self, phases):
+        """
+        Filas de desglose por fase: endpoint, % keep-alive y p50/p95 de cada
+        fase, seguido del p50/p95 de cada métrica Server-Timing recibida.
+        """
+        with self._lock:
+            rows = []
+            for name in sorted(self.endpoints):
+                stats = self.endpoints[name]
+                count = stats.latency.count
+                row = [name, round(100.0 * stats.reused / count) if count else None]
+                for phase in phases:
+                    hist = stats.phases.get(phase, Histogram())
+                    row.append(f"{_fmt(hist.percentile(50))}/{_fmt(hist.percentile(95))}")
+                server = ", ".join(
+                    f"{metric} {_fmt(h.percentile(50))}/{_fmt(h.percentile(95))}"
+                    for metric, h in sorted(stats.server.items())
+                )
+                row.append(server or "-")
+                rows.append(row)
+            return rows
+
+
+class ColdStartRecorder:
+    """Sink que guarda las primeras `limit` muestras tal cual llegaron"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def __call__(self, sample):
+        with self._lock:
+            if len(self.samples) < self.limit:
+                self.samples.append(sample)
+
+    @property
+    def full(self):
+        with self._lock:
+            return len(self.samples) >= self.limit
+
+
+REPORT_COLUMNS = ["endpoint", "n", "err", "p50 ms", "p95 ms", "p99 ms", "max ms"]
+
+
+def phase_columns(phases):
+    """Títulos para MetricsCollector.phase_rows (valores p50/p95 en ms)"""
+    return ["endpoint", "keep-alive %"] + list(phases) + ["server-timing"]
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def _record_into(histograms, values):
+    for name, value in values.items():
+        hist = histograms.get(name)
+        if hist is None:
+            hist = histograms[name] = Histogram()
+        hist.record(value)
+
+
+def _merge_into(histograms, others):
+    for name, other in others.items():
+        if name in histograms:
+            histograms[name].merge(other)
+        else:
+            histograms[name] = Histogram().merge(other)
@@ -0,0 +1,452 @@
+"""
+Escenario: pruebas basadas en modelo del ciclo de vida de devoluciones
+======================================================================
+
+En vez de los dos caminos fijos del script (aprobar y rechazar), mantiene
+en memoria el modelo de estados de `08_ESTADOS_Y_VALIDACIONES.md`:
+
+    REQUESTED -> IN_EVALUATION -> COMPLETED (o APPROVED)
+              \\               \\-> REJECTED
+               \\-> REJECTED
+
+y dispara transiciones aleatorias, válidas e inválidas, con todos los roles
+(cliente dueño, otro cliente, manager, admin) sobre muchas devoluciones a
+la vez. Cada respuesta se compara con lo que predice el modelo:
+
+- ok         -> 200 (y el `status` devuelto coincide con el modelo)
+- invalid    -> 400/409 (transición no permitida desde ese estado)
+- forbidden  -> 403/404 (el rol no puede tocar esa devolución)
+
+Con `race` la misma transición se dispara N veces en paralelo: si es
+válida debe ganar exactamente una. Cuando una respuesta no coincide, la
+secuencia de pasos de esa devolución se reduce (delta debugging,
+reproduciéndola sobre devoluciones nuevas) hasta un repro mínimo.
+
+`approve` deja la devolución en COMPLETED según `03_DEVOLUCIONES.md` y
+el frontend (`MyReturns.jsx`, `ManagerReturns.jsx`); se acepta también
+APPROVED, que es lo que documenta `08_ESTADOS_Y_VALIDACIONES.md`.
+CANCELLED (cancelada por el cliente) es terminal.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .calentamiento import print_cold_start_report, warm_up
+from .cliente import (add_connection_arguments, client_from_args, login_clients, parse_credentials,
+                      print_phase_report)
+from .flujo_devoluciones import ReturnsFlow, find_product, login_staff
+from .metricas import REPORT_COLUMNS
+from .salida import (Colors, print_data, print_error, print_header, print_info, print_success,
+                     print_table)
+
+# Acción -> {estado origen: estado destino}
+TRANSITIONS = {
+    "send_to_evaluation": {"REQUESTED": "IN_EVALUATION"},
+    "approve": {"IN_EVALUATION": "COMPLETED"},
+    "reject": {"REQUESTED": "REJECTED", "IN_EVALUATION": "REJECTED"},
+}
+# Estado del modelo -> estados que puede devolver el backend en su lugar
+EQUIVALENT_STATES = {"COMPLETED": ("COMPLETED", "APPROVED")}
+TERMINAL_STATES = ("COMPLETED", "APPROVED", "REJECTED", "CANCELLED")
+ACTIONS = tuple(TRANSITIONS) + ("detail",)
+
+# "cliente" es el dueño de la devolución; "otro_cliente" cualquier otro
+ROLES = ("cliente", "otro_cliente", "manager", "admin")
+STAFF_ROLES = ("manager", "admin")
+
+EXPECTED_STATUSES = {
+    "ok": (200,),
+    "invalid": (400, 409),
+    "forbidden": (403, 404),
+}
+
+ACTION_BODIES = {
+    "send_to_evaluation": {},
+    "approve": {"evaluation_notes": "Prueba basada en modelo: aprobada."},
+    "reject": {"rejection_reason": "Prueba basada en modelo: rechazada."},
+}
+
+
+@dataclass(frozen=True)
+class Step:
+    """Un paso de la secuencia: acción, rol y cuántas copias en paralelo"""
+    action: str
+    role: str
+    race: int = 1
+
+    def __str__(self):
+        suffix = f" x{self.race} en paralelo" if self.race > 1 else ""
+        return f"{self.role} -> {self.action}{suffix}"
+
+
+def expected_outcome(state, step):
+    """Predicción del modelo: (resultado esperado, estado siguiente)"""
+    if step.action == "detail":
+        if step.role == "otro_cliente":
+            return "forbidden", state
+        return "ok", state
+    if step.role not in STAFF_ROLES:
+        return "forbidden", state
+    target = TRANSITIONS[step.action].get(state)
+    if target is None:
+        return "invalid", state
+    return "ok", target
+
+
+def classify(status):
+    """Clase de resultado observada; None si no encaja en ninguna"""
+    for outcome, statuses in EXPECTED_STATUSES.items():
+        if status in statuses:
+            return outcome
+    return None
+
+
+@dataclass
+class ReturnUnderTest:
+    """Una devolución real y su estado en el modelo"""
+    return_id: int
+    owner: str
+    state: str = "REQUESTED"
+    history: list = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelChecker:
+    """Motor de pruebas: aplica pasos, compara con el modelo y reduce fallos"""
+
+    def __init__(self, client, flow, aliases, race_rate=0.05, race_size=4):
+        self.client = client
+        self.flow = flow
+        self.aliases = aliases
+        self.race_rate = race_rate
+        self.race_size = race_size
+        self._lock = threading.Lock()
+        self.steps = 0
+        self.requests = 0
+        self.inconclusive = 0
+        self.outcomes = {}
+        self.failures = []
+
+    def _other_client(self, owner):
+        others = [a for a in self.aliases if a != owner]
+        return others[0] if others else None
+
+    def _alias(self, role, owner):
+        if role == "cliente":
+            return owner
+        if role == "otro_cliente":
+            return self._other_client(owner)
+        return role
+
+    def open_return(self, owner):
+        return_id, _ = self.flow.open_return(owner)
+        if return_id is None:
+            return None
+        return ReturnUnderTest(return_id, owner)
+
+    def _send(self, rut, step):
+        alias = self._alias(step.role, rut.owner)
+        if step.action == "detail":
+            return self.client.request("GET", "deliveries/returns/{id}/", alias,
+                                       {"id": rut.return_id})
+        return self.client.request("POST", f"deliveries/returns/{{id}}/{step.action}/", alias,
+                                   {"id": rut.return_id}, json=ACTION_BODIES[step.action])
+
+    def apply(self, rut, step):
+        """
+        Ejecuta un paso sobre `rut` y actualiza su estado en el modelo.
+        Devuelve (veredicto, detalle): veredicto es "pass", "fail" o
+        "inconclusive" (timeout/conexión: no dice nada del backend).
+        """
+        expected, next_state = expected_outcome(rut.state, step)
+        if step.race > 1:
+            results = [None] * step.race
+            threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, self._send(rut, step)))
+                       for i in range(step.race)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        else:
+            results = [self._send(rut, step)]
+
+        with self._lock:
+            self.steps += 1
+            self.requests += len(results)
+            key = f"{step.action}/{step.role}/{expected}"
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+        if any(r.status == 0 for r in results):
+            with self._lock:
+                self.inconclusive += 1
+            # El estado real es incierto: se resincroniza con el backend
+            self._resync(rut)
+            return "inconclusive", None
+
+        observed = [classify(r.status) for r in results]
+        statuses = [r.status for r in results]
+        if step.race > 1 and expected == "ok":
+            # Exactamente una gana; las demás ven la transición ya hecha
+            ok_count = observed.count("ok")
+            if ok_count != 1 or any(o not in ("ok", "invalid") for o in observed):
+                return "fail", (f"esperado 1 x 200 y el resto 400/409 "
+                                f"desde {rut.state}, obtenido {statuses}")
+        elif any(o != expected for o in observed):
+            return "fail", f"esperado {expected} desde {rut.state}, obtenido {statuses}"
+
+        if expected == "ok":
+            winner = next(r for r in results if r.status == 200)
+            reported = winner.data.get("status") if isinstance(winner.data, dict) else None
+            accepted = EQUIVALENT_STATES.get(next_state, (next_state,))
+            if reported is not None and reported not in accepted:
+                return "fail", (f"estado devuelto {reported}, el modelo espera "
+                                f"{' o '.join(accepted)} (desde {rut.state})")
+            if reported is not None:
+                next_state = reported
+        rut.state = next_state
+        return "pass", None
+
+    def _resync(self, rut):
+        result = self.client.request("GET", "deliveries/returns/{id}/", "manager",
+                                     {"id": rut.return_id})
+        if result.ok and isinstance(result.data, dict) and result.data.get("status"):
+            rut.state = result.data["status"]
+
+    def random_step(self, rng, rut):
+        """Paso aleatorio; favorece transiciones válidas para avanzar el ciclo"""
+        valid = [a for a, moves in TRANSITIONS.items() if rut.state in moves]
+        if valid and rng.random() < 0.5:
+            action = rng.choice(valid)
+            role = rng.choice(STAFF_ROLES)
+        else:
+            action = rng.choice(ACTIONS)
+            role = rng.choice(ROLES)
+            if role == "otro_cliente" and self._other_client(rut.owner) is None:
+                role = "cliente"
+        race = 1
+        if action != "detail" and rng.random() < self.race_rate:
+            race = self.race_size
+        return Step(action, role, race)
+
+    def replay(self, steps, owner):
+        """
+        Reproduce `steps` sobre una devolución nueva.
+        Devuelve (veredicto, detalle) del primer paso que no pase.
+        """
+        rut = self.open_return(owner)
+        if rut is None:
+            return "inconclusive", "no se pudo abrir devolución"
+        for step in steps:
+            verdict, detail = self.apply(rut, step)
+            if verdict != "pass":
+                return verdict, detail
+        return "pass", None
+
+    def shrink(self, steps, owner, max_replays=200):
+        """
+        Delta debugging (ddmin) sobre la secuencia: quita bloques mientras
+        el fallo se siga reproduciendo. Devuelve (pasos mínimos, reproducible).
+        """
+        replays = 0
+
+        def fails(candidate):
+            nonlocal replays
+            replays += 1
+            return self.replay(candidate, owner)[0] == "fail"
+
+        if not fails(steps):
+            return steps, False
+
+        n = 2
+        while len(steps) >= 2 and replays < max_replays:
+            chunk = max(1, len(steps) // n)
+            reduced = False
+            for start in range(0, len(steps), chunk):
+                candidate = steps[:start] + steps[start + chunk:]
+                if candidate and replays < max_replays and fails(candidate):
+                    steps = candidate
+                    n = max(n - 1, 2)
+                    reduced = True
+                    break
+            if not reduced:
+                if chunk == 1:
+                    break
+                n = min(n * 2, len(steps))
+        return steps, True
+
+    def summary(self, elapsed):
+        """Contadores de la corrida (antes de reducir fallos)"""
+        with self._lock:
+            return {
+                "elapsed_s": round(elapsed, 2),
+                "steps": self.steps,
+                "steps_per_s": round(self.steps / elapsed, 1) if elapsed else None,
+                "requests_per_s": round(self.requests / elapsed, 1) if elapsed else None,
+                "inconclusive": self.inconclusive,
+                "failures": len(self.failures),
+                "outcomes": dict(self.outcomes),
+            }
+
+    def record_failure(self, rut, detail):
+        with self._lock:
+            self.failures.append({
+                "return_id": rut.return_id,
+                "owner": rut.owner,
+                "steps": list(rut.history),
+                "detail": detail,
+            })
+
+    def run(self, n_returns, threads, duration_s, max_failures=5, seed=None):
+        """Ejecuta el motor `duration_s` segundos; devuelve segundos reales"""
+        print_info(f"Abriendo {n_returns} devoluciones de prueba...")
+        returns = []
+        for i in range(n_returns):
+            rut = self.open_return(self.aliases[i % len(self.aliases)])
+            if rut is not None:
+                returns.append(rut)
+        if not returns:
+            print_error("No se pudo abrir ninguna devolución")
+            return 0.0
+        print_success(f"{len(returns)} devoluciones abiertas")
+
+        stop = threading.Event()
+        deadline = time.perf_counter() + duration_s
+        # Huecos que siguen en prueba; sólo se sortea entre éstos
+        live = list(range(len(returns)))
+        live_lock = threading.Lock()
+
+        def retire(slot):
+            """Saca el hueco del sorteo; el hilo que retira el último detiene la corrida"""
+            with live_lock:
+                live.remove(slot)
+                empty = not live
+            if empty:
+                print_error("No quedan devoluciones en prueba")
+                stop.set()
+
+        def worker(i):
+            rng = random.Random(None if seed is None else seed + i)
+            while not stop.is_set() and time.perf_counter() < deadline:
+                with live_lock:
+                    if not live:
+                        return
+                    slot = rng.choice(live)
+                rut = returns[slot]
+                if rut is None:
+                    # Se está retirando en otro hilo
+                    continue
+                if not rut.lock.acquire(blocking=False):
+                    time.sleep(0.001)
+                    continue
+                try:
+                    if returns[slot] is not rut:
+                        # Otro hilo la reemplazó antes de tomar el lock
+                        continue
+                    if rut.state in TERMINAL_STATES and rng.random() < 0.3:
+                        # Reponer: una devolución nueva en el mismo hueco
+                        fresh = self.open_return(rut.owner)
+                        if fresh is not None:
+                            returns[slot] = fresh
+                        continue
+                    step = self.random_step(rng, rut)
+                    rut.history.append(step)
+                    verdict, detail = self.apply(rut, step)
+                    if verdict == "fail":
+                        self.record_failure(rut, detail)
+                        # La devolución queda en estado desconocido: se reemplaza,
+                        # o se retira el hueco si no se pudo abrir otra (sin stock,
+                        # backend saturado) para no registrar el mismo fallo otra vez
+                        returns[slot] = self.open_return(rut.owner)
+                        if returns[slot] is None:
+                            retire(slot)
+                        if len(self.failures) >= max_failures:
+                            stop.set()
+                finally:
+                    rut.lock.release()
+
+        start = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return time.perf_counter() - start
+
+
+def print_model_report(checker, summary, shrunk):
+    """Resumen de la corrida, cobertura por acción/rol y repros mínimos"""
+    print_header("PRUEBAS BASADAS EN MODELO - RESULTADOS")
+    outcomes = summary.pop("outcomes")
+    print_data("Resumen", summary)
+    print_table(["acción/rol/esperado", "pasos"], sorted(outcomes.items()))
+    print()
+
+    if not checker.failures:
+        print_success("Todas las respuestas coinciden con el modelo")
+        return
+    for failure, (steps, reproducible) in zip(checker.failures, shrunk):
+        print_error(f"Devolución {failure['return_id']}: {failure['detail']}")
+        label = "Repro mínimo" if reproducible else "No reproducible; secuencia original"
+        print(f"{Colors.BOLD}{label} ({len(steps)} pasos desde REQUESTED):{Colors.END}")
+        for i, step in enumerate(steps, 1):
+            print(f"  {i}. {step}")
+
+
+def add_arguments(parser):
+    add_connection_arguments(parser)
+    parser.add_argument("--producto", type=int, default=None,
+                        help="ID del producto (default: el primero del catálogo)")
+    parser.add_argument("--devoluciones", type=int, default=20,
+                        help="Devoluciones vivas sobre las que disparar transiciones")
+    parser.add_argument("--hilos", type=int, default=16,
+                        help="Hilos disparando transiciones")
+    parser.add_argument("--duracion", type=float, default=30,
+                        help="Segundos de prueba")
+    parser.add_argument("--prob-carrera", type=float, default=0.05,
+                        help="Probabilidad de disparar una transición en paralelo")
+    parser.add_argument("--max-fallos", type=int, default=5,
+                        help="Se detiene tras este número de fallos")
+    parser.add_argument("--max-replays", type=int, default=200,
+                        help="Reproducciones máximas al reducir cada fallo")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semilla de la secuencia aleatoria")
+
+
+def run(args):
+    print_header("ESCENARIO: PRUEBAS BASADAS EN MODELO (DEVOLUCIONES)")
+    with client_from_args(args) as client:
+        if not login_staff(client, args):
+            return 1
+        aliases = login_clients(client, parse_credentials(args.clientes))
+        if not aliases:
+            print_error("No se pudo autenticar a ningún cliente")
+            return 1
+        if len(aliases) < 2:
+            print_info("Con un solo cliente no se prueba el rol otro_cliente")
+
+        product_id = args.producto or find_product(client)
+        if product_id is None:
+            print_error("No hay productos en la base de datos")
+            return 1
+        warm_up(client, args, aliases)
+
+        checker = ModelChecker(client, ReturnsFlow(client, product_id), aliases,
+                               race_rate=args.prob_carrera)
+        elapsed = checker.run(args.devoluciones, args.hilos, args.duracion,
+                              args.max_fallos, args.seed)
+        summary = checker.summary(elapsed)
+
+        shrunk = []
+        for failure in checker.failures:
+            print_info(f"Reduciendo fallo de la devolución {failure['return_id']} "
+                       f"({len(failure['steps'])} pasos)...")
+            shrunk.append(checker.shrink(failure["steps"], failure["owner"], args.max_replays))
+
+        print_model_report(checker, summary, shrunk)
+        print_header("LATENCIAS")
+        print_table(REPORT_COLUMNS, client.metrics.report_rows())
+        print_phase_report(client.metrics)
+        print_cold_start_report(client)
+        return 1 if checker.failures else 0
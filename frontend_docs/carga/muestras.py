@@ -0,0 +1,335 @@
+"""
+Registro columnar y compacto de muestras crudas
+===============================================
+
+Guardar cada muestra como dict (como los payloads de `print_data`) cuesta
+cientos de bytes; una hora de carga son decenas de millones de muestras.
+SampleRecorder guarda una columna `array` por campo y códigos enteros
+para etapa, endpoint, método y rol (strings internados una sola vez):
+
+    ts (d) | stage (B) | endpoint (H) | method (B) | role (B) | status (H) | latency_ms (f) | bytes (I)
+
+= 23 bytes por muestra. `stage` separa arranque/calentamiento de
+régimen. Cada `chunk_rows` filas el bloque se vuelca a un archivo de
+spool en disco, así la memoria queda acotada a un bloque.
+
+Formato binario exportado (little-endian):
+
+    MAGIC
+    bloque*:  <I filas>  columna_1 ... columna_n   (bytes crudos de cada array)
+    trailer:  JSON {"columns", "stages", "endpoints", "methods", "roles", "rows", "chunks"}
+    <Q largo del trailer>  MAGIC
+
+`read_binary` lo recorre bloque a bloque; también se puede exportar a CSV.
+Resumen o conversión offline de un archivo ya exportado:
+
+    python -m carga muestras corrida.col --csv corrida.csv
+
+El resumen usa sólo las muestras de régimen salvo `--etapa todas`; el
+CSV siempre lleva todas, con su columna `stage`.
+"""
+
+import csv
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+
+from .metricas import REPORT_COLUMNS, STAGE_STEADY, Histogram
+from .salida import print_error, print_header, print_info, print_success, print_table
+
+MAGIC = b"CARGACOL1\n"
+COLUMNS = (
+    ("ts", "d"),
+    ("stage", "B"),
+    ("endpoint", "H"),
+    ("method", "B"),
+    ("role", "B"),
+    ("status", "H"),
+    ("latency_ms", "f"),
+    ("bytes", "I"),
+)
+# Columnas guardadas como código -> nombre en el trailer
+INTERNED = {"stage": "stages", "endpoint": "endpoints", "method": "methods", "role": "roles"}
+DEFAULT_CHUNK_ROWS = 256 * 1024
+
+_ROWS = struct.Struct("<I")
+_TRAILER_LEN = struct.Struct("<Q")
+_SWAP = sys.byteorder == "big"
+
+
+class _Interner:
+    """String -> código entero estable"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.codes = {}
+        self.names = []
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            if len(self.names) >= self.limit:
+                raise ValueError(f"Demasiados valores distintos (máximo {self.limit})")
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class SampleRecorder:
+    """
+    Sink de muestras (se pasa en `sample_sinks` del HarnessClient).
+    Con `export_path`, `close()` exporta a CSV (.csv) o binario columnar.
+    """
+
+    def __init__(self, export_path=None, chunk_rows=DEFAULT_CHUNK_ROWS, spool_dir=None):
+        self.export_path = export_path
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self._interners = {
+            "stage": _Interner(2 ** 8),
+            "endpoint": _Interner(2 ** 16),
+            "method": _Interner(2 ** 8),
+            "role": _Interner(2 ** 8),
+        }
+        self.rows = 0
+        self.chunks = 0
+        spool = tempfile.NamedTemporaryFile(prefix="carga-", suffix=".spool",
+                                            dir=spool_dir, delete=False)
+        self._spool = spool
+        self._spool.write(MAGIC)
+
+    def __call__(self, sample):
+        self.record(sample)
+
+    def record(self, sample):
+        with self._lock:
+            columns = self._columns
+            columns["ts"].append(sample.started_at)
+            columns["stage"].append(self._interners["stage"].code(sample.stage))
+            columns["endpoint"].append(self._interners["endpoint"].code(sample.endpoint))
+            columns["method"].append(self._interners["method"].code(sample.method))
+            columns["role"].append(self._interners["role"].code(sample.role))
+            columns["status"].append(sample.status)
+            columns["latency_ms"].append(sample.latency_ms)
+            columns["bytes"].append(min(sample.bytes, 0xFFFFFFFF))
+            self.rows += 1
+            if len(columns["ts"]) >= self.chunk_rows:
+                self._spill()
+
+    def _spill(self):
+        """Vuelca el bloque en memoria al spool (con el lock tomado)"""
+        rows = len(self._columns["ts"])
+        if not rows:
+            return
+        self._spool.write(_ROWS.pack(rows))
+        for name, typecode in COLUMNS:
+            column = self._columns[name]
+            if _SWAP:
+                column.byteswap()
+            self._spool.write(column.tobytes())
+            self._columns[name] = array(typecode)
+        self.chunks += 1
+
+    def memory_bytes(self):
+        """Bytes que ocupan las columnas en memoria (sin contar el spool)"""
+        with self._lock:
+            return sum(len(c) * c.itemsize for c in self._columns.values())
+
+    def _trailer(self):
+        trailer = {
+            "columns": [[name, typecode, array(typecode).itemsize] for name, typecode in COLUMNS],
+            "rows": self.rows,
+            "chunks": self.chunks,
+        }
+        for column, key in INTERNED.items():
+            trailer[key] = list(self._interners[column].names)
+        return json.dumps(trailer).encode()
+
+    def export_binary(self, path):
+        """Copia el spool a `path` y le agrega el trailer con los diccionarios"""
+        with self._lock:
+            self._spill()
+            self._spool.flush()
+            trailer = self._trailer()
+            with open(self._spool.name, "rb") as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+                dst.write(trailer)
+                dst.write(_TRAILER_LEN.pack(len(trailer)))
+                dst.write(MAGIC)
+
+    def export_csv(self, path):
+        """Exporta a CSV leyendo el spool bloque a bloque"""
+        with self._lock:
+            self._spill()
+            self._spool.flush()
+            names = {column: self._interners[column].names for column in INTERNED}
+            with open(self._spool.name, "rb") as src, \
+                    open(path, "w", newline="", encoding="utf-8") as dst:
+                src.read(len(MAGIC))
+                writer = csv.writer(dst)
+                writer.writerow([name for name, _ in COLUMNS])
+                for chunk in _iter_chunks(src, COLUMNS):
+                    _write_csv_rows(writer, chunk, names)
+
+    def export(self, path):
+        """Exporta según la extensión: .csv o binario columnar"""
+        if path.lower().endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_binary(path)
+
+    def close(self):
+        """Exporta a `export_path` (si hay) y borra el spool"""
+        if self._spool.closed:
+            return
+        try:
+            if self.export_path:
+                self.export(self.export_path)
+        finally:
+            with self._lock:
+                self._spool.close()
+                os.unlink(self._spool.name)
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Archivo de muestras truncado")
+    return data
+
+
+def _iter_chunks(stream, columns, end=None):
+    """Bloques {columna: array} desde la posición actual hasta `end` o EOF"""
+    while end is None or stream.tell() < end:
+        header = stream.read(_ROWS.size)
+        if not header:
+            return
+        (rows,) = _ROWS.unpack(header)
+        chunk = {}
+        for name, typecode in columns:
+            column = array(typecode)
+            column.frombytes(_read_exact(stream, rows * column.itemsize))
+            if _SWAP:
+                column.byteswap()
+            chunk[name] = column
+        yield chunk
+
+
+def _write_csv_rows(writer, chunk, names):
+    """Filas CSV de un bloque, con los códigos internados ya decodificados"""
+    columns = []
+    for name, column in chunk.items():
+        if name in names:
+            column = [names[name][code] for code in column]
+        elif name == "ts":
+            column = [f"{ts:.6f}" for ts in column]
+        elif name == "latency_ms":
+            column = [f"{latency:.3f}" for latency in column]
+        columns.append(column)
+    writer.writerows(zip(*columns))
+
+
+def read_binary(path):
+    """
+    Lee un archivo exportado con `export_binary`.
+    Devuelve (trailer, generador de bloques {columna: array}); los
+    diccionarios para decodificar códigos están en trailer["endpoints"], etc.
+    """
+    stream = open(path, "rb")
+    if stream.read(len(MAGIC)) != MAGIC:
+        stream.close()
+        raise ValueError(f"{path} no es un archivo de muestras columnar")
+    stream.seek(-(_TRAILER_LEN.size + len(MAGIC)), os.SEEK_END)
+    (trailer_len,) = _TRAILER_LEN.unpack(_read_exact(stream, _TRAILER_LEN.size))
+    trailer_start = stream.seek(-(_TRAILER_LEN.size + len(MAGIC) + trailer_len), os.SEEK_END)
+    trailer = json.loads(_read_exact(stream, trailer_len))
+
+    columns = []
+    for name, typecode, itemsize in trailer["columns"]:
+        if array(typecode).itemsize != itemsize:
+            stream.close()
+            raise ValueError(f"Columna {name}: tamaño {itemsize} incompatible con esta plataforma")
+        columns.append((name, typecode))
+
+    def chunks():
+        with stream:
+            stream.seek(len(MAGIC))
+            yield from _iter_chunks(stream, columns, end=trailer_start)
+
+    return trailer, chunks()
+
+
+def binary_to_csv(path, csv_path):
+    """Convierte un archivo binario columnar a CSV, bloque a bloque"""
+    trailer, chunks = read_binary(path)
+    names = {column: trailer[key] for column, key in INTERNED.items() if key in trailer}
+    with open(csv_path, "w", newline="", encoding="utf-8") as dst:
+        writer = csv.writer(dst)
+        writer.writerow([name for name, _, _ in trailer["columns"]])
+        for chunk in chunks:
+            _write_csv_rows(writer, chunk, names)
+
+
+def summarize_binary(path, stage=STAGE_STEADY):
+    """
+    Devuelve (trailer, filas de REPORT_COLUMNS) recalculadas desde las
+    muestras de la etapa `stage` (None = todas)
+    """
+    trailer, chunks = read_binary(path)
+    stages = trailer.get("stages", [])
+    wanted = None if stage is None else (stages.index(stage) if stage in stages else -1)
+    histograms = {}
+    errors = {}
+    for chunk in chunks:
+        rows = zip(chunk["stage"], chunk["endpoint"], chunk["status"], chunk["latency_ms"])
+        for stage_code, code, status, latency in rows:
+            if wanted is not None and stage_code != wanted:
+                continue
+            hist = histograms.get(code)
+            if hist is None:
+                hist = histograms[code] = Histogram()
+                errors[code] = 0
+            hist.record(latency)
+            # Mismo criterio que EndpointStats.errors
+            if status == 0 or status >= 500:
+                errors[code] += 1
+    endpoints = trailer["endpoints"]
+    rows = []
+    for code in sorted(histograms, key=lambda c: endpoints[c]):
+        s = histograms[code].summary()
+        rows.append([endpoints[code], s["count"], errors[code],
+                     s["p50"], s["p95"], s["p99"], s["max"]])
+    return trailer, rows
+
+
+def add_arguments(parser):
+    parser.add_argument("archivo", help="Archivo binario exportado con --muestras")
+    parser.add_argument("--etapa", default=STAGE_STEADY,
+                        help="Etapa a resumir: arranque, calentamiento, regimen o todas")
+    parser.add_argument("--csv", default=None,
+                        help="Convertir además a este archivo CSV")
+
+
+def run(args):
+    print_header("MUESTRAS CRUDAS")
+    try:
+        stage = None if args.etapa == "todas" else args.etapa
+        trailer, rows = summarize_binary(args.archivo, stage)
+    except (OSError, ValueError) as e:
+        print_error(f"No se pudo leer {args.archivo}: {e}")
+        return 1
+    print_info(f"{trailer['rows']} muestras en {trailer['chunks']} bloque(s), "
+               f"{len(trailer['endpoints'])} endpoint(s), roles: {', '.join(trailer['roles'])}, "
+               f"etapas: {', '.join(trailer['stages'])}")
+    print_info(f"Resumen de la etapa: {args.etapa}")
+    print_table(REPORT_COLUMNS, rows)
+    if args.csv:
+        binary_to_csv(args.archivo, args.csv)
+        print_success(f"CSV escrito en {args.csv}")
+    return 0
@@ -0,0 +1,209 @@
+"""
+Capa de resiliencia del cliente del harness
+===========================================
+
+Bajo sobrecarga el backend responde 429/502/503/504 o no responde. En vez
+de dar la llamada por fallida al primer intento:
+
+- RetryPolicy: reintenta con backoff exponencial y jitter completo
+  (espera aleatoria entre 0 y min(max, base * 2^intento)), respetando
+  `Retry-After`. Los GET se reintentan siempre; los POST/PATCH sólo si
+  llevan `Idempotency-Key` (p.ej. `approve/`), para no duplicar efectos.
+- CircuitBreaker: por plantilla de endpoint. Tras N fallos seguidos se
+  abre y corta las llamadas sin enviarlas durante `open_s` segundos;
+  luego deja pasar una de prueba (half-open) y se cierra si sale bien.
+- ResilienceStats: reintentos, abandonos y cortes por endpoint, para
+  reportar goodput (lo que de verdad terminó bien) aparte del throughput
+  bruto (todo lo que se envió).
+"""
+
+import random
+import threading
+import time
+
+RETRYABLE_STATUSES = (429, 502, 503, 504)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def is_overload(status):
+    """Timeout/conexión (0), 429 o 5xx: señal de sobrecarga del backend"""
+    return status == 0 or status == 429 or status >= 500
+
+
+class RetryPolicy:
+    """Cuándo y cuánto esperar antes de reintentar"""
+
+    def __init__(self, max_retries=3, base_ms=100, max_ms=5000, rng=None):
+        self.max_retries = max_retries
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self._rng = rng or random.Random()
+
+    def retryable(self, method, headers, status):
+        if status != 0 and status not in RETRYABLE_STATUSES:
+            return False
+        if method.upper() in SAFE_METHODS:
+            return True
+        return IDEMPOTENCY_HEADER in headers
+
+    def delay_s(self, attempt, retry_after=None):
+        """Espera antes del reintento número `attempt` (1 = primer reintento)"""
+        cap = min(self.max_ms, self.base_ms * 2 ** (attempt - 1))
+        delay = self._rng.uniform(0, cap) / 1000
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_ms / 1000))
+            except ValueError:
+                # Retry-After con fecha HTTP: se usa el backoff propio
+                pass
+        return delay
+
+
+class CircuitBreaker:
+    """Breaker de un endpoint: closed -> open -> half-open -> closed"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, open_s=5.0):
+        self.failure_threshold = failure_threshold
+        self.open_s = open_s
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        ¿Se puede enviar la llamada ahora? Devuelve (permitida, es_prueba);
+        `es_prueba` se devuelve tal cual a `record`.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True, False
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.open_s:
+                    return False, False
+                self.state = self.HALF_OPEN
+            # Half-open: una sola llamada de prueba a la vez
+            if self._probe_in_flight:
+                return False, False
+            self._probe_in_flight = True
+            return True, True
+
+    def record(self, status, probe=False):
+        """Registra el resultado; devuelve True si el breaker se acaba de abrir"""
+        with self._lock:
+            if probe:
+                self._probe_in_flight = False
+            elif self.state != self.CLOSED:
+                # Llamada enviada antes de abrirse: no decide nada
+                return False
+            if not is_overload(status):
+                self.state = self.CLOSED
+                self._failures = 0
+                return False
+            self._failures += 1
+            if probe or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+class ResilienceStats:
+    """Contadores por endpoint, seguros entre hilos"""
+
+    FIELDS = ("retries", "gave_up", "short_circuited", "breaker_opened")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def add(self, endpoint, name, n=1):
+        with self._lock:
+            counts = self.endpoints.setdefault(endpoint, dict.fromkeys(self.FIELDS, 0))
+            counts[name] += n
+
+    def drain(self):
+        """Contadores acumulados desde el último drain (serializable), y reinicia"""
+        with self._lock:
+            endpoints, self.endpoints = self.endpoints, {}
+            return endpoints
+
+    def merge_dict(self, endpoints):
+        """Suma los contadores de un drain (p.ej. recibido de un worker)"""
+        for endpoint, counts in endpoints.items():
+            for name, n in counts.items():
+                self.add(endpoint, name, n)
+
+    def totals(self):
+        with self._lock:
+            totals = dict.fromkeys(self.FIELDS, 0)
+            for counts in self.endpoints.values():
+                for name, n in counts.items():
+                    totals[name] += n
+            return totals
+
+    def rows(self):
+        with self._lock:
+            return [[endpoint] + [counts[name] for name in self.FIELDS]
+                    for endpoint, counts in sorted(self.endpoints.items())]
+
+
+class Resilience:
+    """Política de reintentos + breakers por endpoint + estadísticas"""
+
+    def __init__(self, retry=None, failure_threshold=0, open_s=5.0):
+        self.retry = retry
+        # failure_threshold=0 desactiva los breakers
+        self.failure_threshold = failure_threshold
+        self.open_s = open_s
+        self.stats = ResilienceStats()
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, endpoint):
+        if not self.failure_threshold:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    self.failure_threshold, self.open_s)
+            return breaker
+
+    def reset(self):
+        """Cierra todos los breakers y pone las estadísticas en cero"""
+        with self._lock:
+            self._breakers = {}
+        self.stats.drain()
+
+    def allow(self, endpoint):
+        """Devuelve (permitida, es_prueba) según el breaker del endpoint"""
+        breaker = self._breaker(endpoint)
+        if breaker is None:
+            return True, False
+        allowed, probe = breaker.allow()
+        if not allowed:
+            self.stats.add(endpoint, "short_circuited")
+        return allowed, probe
+
+    def record(self, endpoint, status, probe=False):
+        breaker = self._breaker(endpoint)
+        if breaker is not None and breaker.record(status, probe):
+            self.stats.add(endpoint, "breaker_opened")
+
+    def next_delay(self, method, endpoint, headers, result, attempt):
+        """
+        Segundos a esperar antes de reintentar, o None si no se reintenta.
+        `attempt` es el número del intento que acaba de terminar (1, 2, ...).
+        """
+        if self.retry is None or not self.retry.retryable(method, headers, result.status):
+            return None
+        if attempt > self.retry.max_retries:
+            self.stats.add(endpoint, "gave_up")
+            return None
+        self.stats.add(endpoint, "retries")
+        return self.retry.delay_s(attempt, result.headers.get("Retry-After"))
@@ -0,0 +1,61 @@
+"""
+Helpers de salida por consola para el harness de carga
+=======================================================
+
+Mismo formato que `test_flujo_completo_devoluciones.py`, para que los
+reportes de carga se lean igual que el script del flujo completo.
+"""
+
+import json
+
+
+# Colores para output
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+
+def print_header(text):
+    """Imprime un header destacado"""
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.CYAN}{text}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.END}\n")
+
+
+def print_success(text):
+    """Imprime mensaje de éxito"""
+    print(f"{Colors.GREEN}[OK] {text}{Colors.END}")
+
+
+def print_error(text):
+    """Imprime mensaje de error"""
+    print(f"{Colors.RED}[ERROR] {text}{Colors.END}")
+
+
+def print_info(text):
+    """Imprime mensaje informativo"""
+    print(f"{Colors.YELLOW}[INFO] {text}{Colors.END}")
+
+
+def print_data(label, data):
+    """Imprime datos en formato JSON"""
+    print(f"{Colors.CYAN}{label}:{Colors.END}")
+    print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def print_table(columns, rows):
+    """Imprime una tabla alineada (columnas = lista de títulos)"""
+    widths = [len(c) for c in columns]
+    for row in rows:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(str(cell)))
+
+    line = "  ".join(c.rjust(widths[i]) for i, c in enumerate(columns))
+    print(f"{Colors.BOLD}{line}{Colors.END}")
+    for row in rows:
+        print("  ".join(str(cell).rjust(widths[i]) for i, cell in enumerate(row)))
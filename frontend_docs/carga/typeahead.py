@@ -0,0 +1,247 @@
+"""
+Escenario: typeahead del carrito por lenguaje natural
+=====================================================
+
+Reproduce lo que hace `VoiceCartAssistant` con `nlpService`: mientras el
+usuario escribe se pide `orders/cart/suggestions/?q=<prefijo>` y al
+terminar se envía la frase a `orders/cart/add-natural-language/`.
+
+Cada tecleador virtual escribe frases reales con ritmo aleatorio:
+- Debounce: sólo se pide sugerencia si pasan `debounce_ms` sin teclear
+  (0 = una request por tecla, como hace hoy `src/services/api.js`).
+- Cancelación: al disparar una sugerencia nueva, o al terminar/abandonar la
+  frase, las sugerencias pendientes se cancelan. Las que aún esperan en la
+  cola del cliente se descartan sin enviarse; las que ya están en vuelo,
+  como con un abort de axios, el backend igual las procesa: su latencia
+  cuenta como trabajo desperdiciado.
+- Abandono: con probabilidad `abandon_rate` el usuario deja de escribir a
+  mitad de frase y no envía nada.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .calentamiento import print_cold_start_report, warm_up
+from .cliente import (add_connection_arguments, client_from_args, login_clients, parse_credentials,
+                      print_phase_report)
+from .metricas import Histogram, REPORT_COLUMNS
+from .salida import print_data, print_error, print_header, print_info, print_success, print_table
+
+SUGGESTIONS_ENDPOINT = "orders/cart/suggestions/"
+NLP_ENDPOINT = "orders/cart/add-natural-language/"
+
+PHRASES = [
+    "agrega 2 laptops hp",
+    "quiero 3 teclados mecanicos",
+    "añade un mouse inalambrico",
+    "agregar 1 monitor samsung de 27 pulgadas",
+    "pon 2 audifonos bluetooth en el carrito",
+    "necesito 5 cables usb tipo c",
+    "agrega una impresora epson",
+    "quiero 2 memorias ram de 16gb",
+]
+
+
+class TypeaheadStats:
+    """Acumulador del escenario, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.keystrokes = 0
+        self.fired = 0
+        # Canceladas antes de enviarse (nunca llegaron al backend)
+        self.aborted = 0
+        # Canceladas con la request ya en vuelo (el backend las procesó)
+        self.cancelled = 0
+        self.cancelled_ms = 0.0
+        self.displayed = 0
+        self.submitted = 0
+        self.abandoned = 0
+        # Desde la última tecla hasta que el usuario ve la sugerencia
+        self.keystroke_latency = Histogram()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def displayed_after(self, latency_ms):
+        with self._lock:
+            self.displayed += 1
+            self.keystroke_latency.record(latency_ms)
+
+    def cancelled_request(self, latency_ms):
+        with self._lock:
+            self.cancelled += 1
+            self.cancelled_ms += latency_ms
+
+
+class Typist:
+    """Un usuario virtual escribiendo en el asistente de carrito"""
+
+    def __init__(self, client, alias, pool, stats, rng, debounce_ms, key_interval_ms,
+                 abandon_rate, min_chars):
+        self.client = client
+        self.alias = alias
+        self.pool = pool
+        self.stats = stats
+        self.rng = rng
+        self.debounce_ms = debounce_ms
+        self.key_interval_ms = key_interval_ms
+        self.abandon_rate = abandon_rate
+        self.min_chars = min_chars
+        self._in_flight = []
+
+    def _key_delay_ms(self):
+        # Ritmo humano: mayormente constante, con pausas ocasionales
+        delay = self.rng.gauss(self.key_interval_ms, self.key_interval_ms * 0.35)
+        if self.rng.random() < 0.08:
+            delay += self.rng.uniform(300, 900)
+        return max(20.0, delay)
+
+    def _fire(self, prefix, last_key_at):
+        self._cancel_in_flight()
+        future = self.pool.submit(self.client.request, "GET", SUGGESTIONS_ENDPOINT,
+                                  self.alias, params={"q": prefix})
+        entry = {"future": future, "cancelled": False, "last_key_at": last_key_at}
+        future.add_done_callback(lambda f, e=entry: self._settle(e))
+        self._in_flight.append(entry)
+        self.stats.add(fired=1)
+
+    def _settle(self, entry):
+        if entry["future"].cancelled():
+            return
+        result = entry["future"].result()
+        if entry["cancelled"]:
+            self.stats.cancelled_request(result.sample.latency_ms)
+        elif result.ok:
+            self.stats.displayed_after((time.perf_counter() - entry["last_key_at"]) * 1000)
+
+    def _cancel_in_flight(self):
+        for entry in self._in_flight:
+            if entry["future"].cancel():
+                self.stats.add(aborted=1)
+            elif not entry["future"].done():
+                entry["cancelled"] = True
+        self._in_flight = [e for e in self._in_flight if not e["future"].done()]
+
+    def type_phrase(self, phrase):
+        """Escribe una frase tecla a tecla y la envía (o la abandona)"""
+        abandon_at = None
+        if self.rng.random() < self.abandon_rate:
+            abandon_at = self.rng.randint(1, len(phrase) - 1)
+
+        for i in range(1, len(phrase) + 1):
+            if abandon_at is not None and i > abandon_at:
+                break
+            last_key_at = time.perf_counter()
+            self.stats.add(keystrokes=1)
+            is_last = i == len(phrase) or i == abandon_at
+            next_key_ms = 0.0 if is_last else self._key_delay_ms()
+
+            if i >= self.min_chars and (is_last or next_key_ms >= self.debounce_ms):
+                time.sleep(self.debounce_ms / 1000)
+                self._fire(phrase[:i], last_key_at)
+                time.sleep(max(0.0, next_key_ms - self.debounce_ms) / 1000)
+            else:
+                time.sleep(next_key_ms / 1000)
+
+        if abandon_at is not None:
+            self._cancel_in_flight()
+            self.stats.add(abandoned=1)
+            return
+
+        # Enter: el frontend descarta sugerencias pendientes y envía el comando
+        time.sleep(self.rng.uniform(0.1, 0.4))
+        self._cancel_in_flight()
+        self.client.request("POST", NLP_ENDPOINT, self.alias, json={"prompt": phrase})
+        self.stats.add(submitted=1)
+
+
+def run_typeahead(client, aliases, typists, sessions, debounce_ms=0, key_interval_ms=120,
+                  abandon_rate=0.2, min_chars=1, seed=None):
+    """Ejecuta `typists` tecleadores concurrentes, `sessions` frases cada uno"""
+    stats = TypeaheadStats()
+    # Varias requests en vuelo por tecleador cuando no hay debounce
+    pool = ThreadPoolExecutor(max_workers=max(4, typists * 4))
+
+    def worker(i):
+        rng = random.Random(None if seed is None else seed + i)
+        typist = Typist(client, aliases[i % len(aliases)], pool, stats, rng, debounce_ms,
+                        key_interval_ms, abandon_rate, min_chars)
+        for _ in range(sessions):
+            typist.type_phrase(rng.choice(PHRASES))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(typists)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+
+    suggestions = client.metrics.histogram(SUGGESTIONS_ENDPOINT)
+    nlp = client.metrics.histogram(NLP_ENDPOINT)
+    sent = stats.fired - stats.aborted
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "keystrokes": stats.keystrokes,
+        "suggestion_requests": sent,
+        "requests_per_keystroke": round(sent / stats.keystrokes, 3) if stats.keystrokes else None,
+        "displayed": stats.displayed,
+        "aborted_before_send": stats.aborted,
+        "cancelled": stats.cancelled,
+        "cancelled_ratio": round(stats.cancelled / sent, 3) if sent else None,
+        "cancelled_server_ms": round(stats.cancelled_ms, 1),
+        "submitted": stats.submitted,
+        "abandoned": stats.abandoned,
+        "keystroke_to_display_ms": stats.keystroke_latency.summary(),
+        "suggestions_rps": round(suggestions.count / elapsed, 2) if elapsed else None,
+        "nlp_rps": round(nlp.count / elapsed, 2) if elapsed else None,
+    }
+
+
+def add_arguments(parser):
+    add_connection_arguments(parser)
+    parser.add_argument("--tecleadores", type=int, default=10,
+                        help="Usuarios escribiendo a la vez")
+    parser.add_argument("--sesiones", type=int, default=3,
+                        help="Frases por tecleador")
+    parser.add_argument("--debounce-ms", type=float, default=0,
+                        help="Ventana de debounce (0 = una request por tecla)")
+    parser.add_argument("--intervalo-tecla-ms", type=float, default=120,
+                        help="Intervalo medio entre teclas")
+    parser.add_argument("--prob-abandono", type=float, default=0.2,
+                        help="Probabilidad de abandonar la frase a medias")
+    parser.add_argument("--min-caracteres", type=int, default=1,
+                        help="Largo mínimo del prefijo para pedir sugerencias")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semilla para reproducir el ritmo de tecleo")
+
+
+def run(args):
+    print_header("ESCENARIO: TYPEAHEAD NLP DEL CARRITO")
+    with client_from_args(args) as client:
+        aliases = login_clients(client, parse_credentials(args.clientes))
+        if not aliases:
+            print_error("No se pudo autenticar a ningún cliente")
+            return 1
+        print_success(f"{len(aliases)} cliente(s) autenticado(s)")
+        warm_up(client, args, aliases)
+        print_info(f"{args.tecleadores} tecleadores x {args.sesiones} frases, "
+                   f"debounce {args.debounce_ms} ms")
+
+        summary = run_typeahead(client, aliases, args.tecleadores, args.sesiones,
+                                args.debounce_ms, args.intervalo_tecla_ms,
+                                args.prob_abandono, args.min_caracteres, args.seed)
+
+        print_header("TYPEAHEAD - RESULTADOS")
+        print_table(REPORT_COLUMNS, client.metrics.report_rows())
+        print()
+        print_data("Resumen", summary)
+        print_phase_report(client.metrics)
+        print_cold_start_report(client)
+        return 0